@@ -0,0 +1,61 @@
+"""
+AreaFilter.in_range with 1k items against 200 zipcodes
+
+python benchmarks/bench_distance.py [--items 1000] [--zipcodes 200] [--json results.jsonl]
+
+- haversine numpy: all items against all zipcodes in one array operation
+- haversine python: the same without numpy, pair by pair
+- geodesic: geopy's exact distance pair by pair (the method before AreaFilter)
+the points are spread over Germany, the areas are 5 to 20 km around the zipcodes, so most items are checked against all of them
+"""
+import random
+
+import common
+
+
+def main():
+    arguments = common.get_arguments(__doc__.strip().splitlines()[0], lambda parser: (
+        parser.add_argument("--items", type=int, default=1000, help="item locations per search"),
+        parser.add_argument("--zipcodes", type=int, default=200, help="zipcodes of the filter areas"),
+    ))
+    common.setup()
+    from ebayAlert.geo import distance
+    from ebayAlert.geo.distance import AreaFilter
+
+    rand = random.Random(0)
+
+    def point():
+        return rand.uniform(47.5, 54.8), rand.uniform(6.0, 14.9)
+    # areas of 10 zipcodes each
+    zipcodes = [point() for _ in range(arguments.zipcodes)]
+    areas = [(rand.choice((5, 10, 20)), zipcodes[n:n + 10]) for n in range(0, len(zipcodes), 10)]
+    items = [point() if n % 20 else None for n in range(arguments.items)]
+
+    numpy = distance.np
+    rows = []
+    results = {}
+    for name, method, use_numpy in (("haversine numpy", "haversine", True), ("haversine python", "haversine", False),
+                                    ("geodesic", "geodesic", False)):
+        if use_numpy and numpy is None:
+            print("numpy is not installed, skipping haversine numpy")
+            continue
+        distance.np = numpy if use_numpy else None
+        try:
+            area_filter = AreaFilter(areas, method)
+            seconds = common.best_of(lambda: results.__setitem__(name, area_filter.in_range(items)),
+                                     1 if method == "geodesic" else arguments.repeat)
+        finally:
+            distance.np = numpy
+        rows.append({"method": name, "items": len(items), "zipcodes": len(zipcodes), "seconds": seconds,
+                     "items_per_s": int(len(items) / seconds), "in_range": sum(results[name])})
+    common.report("distance", rows, arguments.json)
+    # rounding to whole kilometers can only differ for distances right at the limit
+    if "geodesic" in results:
+        for name, in_range in results.items():
+            differences = sum(a != b for a, b in zip(in_range, results["geodesic"]))
+            if differences:
+                print(f"{name}: {differences} items decided differently than geodesic")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+wall-clock scaling of fetch_all with the number of searches against a local stub server
+
+python benchmarks/bench_fetch.py [--searches 1,10,50,150] [--workers 1,4,8] [--latency 0.1] [--page FILE]
+
+the stub answers every search page after --latency seconds with a recorded page (--page, e.g. saved from
+the website) or a synthetic one, the pages are fetched and parsed like in a run
+the request limits of the stub host are FETCH_HOST_CONCURRENCY = workers and --rate (0 = unlimited)
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep
+
+import common
+
+
+def start_server(page: bytes, latency: float) -> ThreadingHTTPServer:
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    arguments = common.get_arguments(__doc__.strip().splitlines()[0], lambda parser: (
+        parser.add_argument("--searches", default="1,10,50,150", help="numbers of searches, comma separated"),
+        parser.add_argument("--workers", default="1,4,8", help="fetching threads, comma separated"),
+        parser.add_argument("--latency", type=float, default=0.1, help="seconds until the stub answers"),
+        parser.add_argument("--rate", type=float, default=0, help="requests per second to the stub, 0 = unlimited"),
+        parser.add_argument("--page", metavar="FILE", help="HTML page answered by the stub"),
+    ))
+    common.setup()
+    from ebayAlert.core.ratelimit import HostLimiter
+    from ebayAlert.core.settings import settings
+    from ebayAlert.crud.search import SearchPlan
+    from ebayAlert.scrapping import fetcher, item
+
+    if arguments.page:
+        with open(arguments.page, "rb") as page_file:
+            page = page_file.read()
+    else:
+        page = common.klein_page(0, 25).encode("utf-8")
+    server = start_server(page, arguments.latency)
+    settings.KLEIN_URL_BASE = f"http://127.0.0.1:{server.server_port}"
+
+    rows = []
+    for workers in (int(workers) for workers in arguments.workers.split(",")):
+        fetcher.configs.FETCH_WORKERS = workers
+        if fetcher._executor is not None:
+            fetcher._executor.shutdown()
+            fetcher._executor = None
+        item.host_limiter = HostLimiter(workers, arguments.rate, max(1, workers))
+        for count in (int(count) for count in arguments.searches.split(",")):
+            searches = [SearchPlan(id=n, status=1, search_type="KLEIN_BENCH", search_string=f"bench{n}", price_low=0,
+                                   price_high=100, price_target=None, price_info=None, zipcodes=None, chat_id=None,
+                                   interval=None, url="/s-bench/{PAGENSEARCH}k0") for n in range(count)]
+            factories = {}
+
+            def fetch():
+                factories.update(fetcher.fetch_all(searches, 1))
+            seconds = common.best_of(fetch, arguments.repeat)
+            assert all(factories[n] is not None and factories[n].item_list for n in range(count))
+            rows.append({"searches": count, "workers": workers, "seconds": seconds, "searches_per_s": count / seconds,
+                         "latency_sum_s": count * arguments.latency})
+    server.shutdown()
+    common.report("fetch", rows, arguments.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+parsing and item extraction of saved result pages per HTML parser backend
+
+python benchmarks/bench_parser.py [--pages DIR] [--parsers selectolax,lxml,html.parser] [--json results.jsonl]
+
+- the fixtures are the pages of a --record directory (start --record DIR), without --pages synthetic
+  Kleinanzeigen and Ebay pages are stored as such a directory first
+- per page: parse with the factory's scope, extract_item_from_page and from_node for every item,
+  as KleinItemFactory and EbayItemFactory do after fetching
+backends that are not installed are skipped, all backends have to find the same items
+"""
+import glob
+import json
+import os
+
+import common
+
+
+def load_pages(directory: str) -> list:
+    pages = []
+    for file_name in sorted(glob.glob(os.path.join(directory, "pages", "*.json"))):
+        with open(file_name, encoding="utf-8") as file:
+            page = json.load(file)
+        if page["status_code"] == 200 and page["text"]:
+            pages.append(page)
+    return pages
+
+
+def main():
+    arguments = common.get_arguments(__doc__.strip().splitlines()[0], lambda parser: (
+        parser.add_argument("--pages", metavar="DIR", help="--record directory with the pages, default synthetic"),
+        parser.add_argument("--parsers", default="selectolax,lxml,html.parser", help="backends, comma separated"),
+        parser.add_argument("--items", type=int, default=25, help="posts per synthetic Kleinanzeigen page"),
+    ))
+    directory = common.setup()
+    from ebayAlert.core.replay import recorder, RECORD
+    from ebayAlert.core.settings import settings
+    from ebayAlert.scrapping.ebay import EbayItem, EbayItemFactory
+    from ebayAlert.scrapping.klein import KleinItem, KleinItemFactory
+    from ebayAlert.scrapping.parser import get_parser
+
+    page_directory = arguments.pages
+    if not page_directory:
+        page_directory = os.path.join(directory, "record")
+        recorder.configure(RECORD, page_directory)
+        for search_no in range(10):
+            recorder.save_page(f"https://www.kleinanzeigen.de/s-bench/seite:{search_no}", 200,
+                               common.klein_page(search_no, arguments.items, pages=5))
+        recorder.save_page(settings.EBAY_URL_BASE + "/b/bench/0", 200, common.ebay_page(0, 50))
+    pages = load_pages(page_directory)
+    if not pages:
+        raise SystemExit(f"no pages in {page_directory}")
+
+    # the scopes of the factories' get_webpage calls
+    kinds = {
+        "klein": (KleinItemFactory, KleinItem, ["#srchrslt-adtable", ".pagination-pages"]),
+        "ebay": (EbayItemFactory, EbayItem, [".brwrvr__item-results--list"]),
+    }
+    fixtures = {"klein": [], "ebay": []}
+    for page in pages:
+        fixtures["ebay" if page["url"].startswith(settings.EBAY_URL_BASE) else "klein"].append(page["text"])
+
+    rows = []
+    found = {}
+    for name in arguments.parsers.split(","):
+        parser = get_parser(name)
+        if parser.name != name:
+            print(f"{name} is not installed, skipped")
+            continue
+        for kind, texts in fixtures.items():
+            if not texts:
+                continue
+            factory, item_class, scope = kinds[kind]
+            factory.parser = parser
+            items = []
+
+            def parse_all():
+                items.clear()
+                for text in texts:
+                    web_page = parser.parse(text, scope)
+                    items.extend(item_class.from_node(node, parser) for node in factory.extract_item_from_page(web_page))
+            seconds = common.best_of(parse_all, arguments.repeat)
+            rows.append({"parser": name, "pages": kind, "count": len(texts), "items": len(items),
+                         "seconds": seconds, "ms_per_page": seconds / len(texts) * 1000})
+            found.setdefault(kind, {})[name] = [(item.id, item.title, item.price) for item in items]
+    common.report("parser", rows, arguments.json)
+    for kind, results in found.items():
+        reference_name, reference = next(iter(results.items()))
+        for name, items in results.items():
+            if items != reference:
+                print(f"{kind}: {name} finds other items than {reference_name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+per-stage timings of the scrape -> match -> notify pipeline (run_searches) over synthetic datasets
+
+python benchmarks/bench_pipeline.py [--sizes 10,100,1000,10000] [--items 25] [--json results.jsonl]
+
+every size runs in a fresh process with its own database:
+- n KLEIN searches (RANGE and TARGET mode, half of them with filter areas) and one EBAY search
+- their pages and the geocoder answers are stored as a --record directory (Recorder) and replayed
+- run "new": all posts are new, run "known": the same pages again
+stages as in the metrics: parse, dedup, enrichment (Ebay matching), filter (evaluation and notifications
+into the outbox), geocoding (distance filter); fetching is not timed when replaying
+parse is summed over the fetching threads and can exceed the total
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+from contextlib import redirect_stdout
+from time import perf_counter
+
+import common
+
+STAGES = ["parse", "dedup", "enrichment", "filter", "geocoding"]
+
+
+def run_size(searches: int, items: int) -> list:
+    # metrics are enabled by a file name, they are read by snapshot() and never written
+    directory = common.setup(METRICS_JSONL_FILE=os.devnull)
+    from ebayAlert.core.metrics import metrics
+    from ebayAlert.core.replay import recorder, RECORD, REPLAY
+    from ebayAlert.crud.search import crud_search
+    from ebayAlert.db.db import Session_klein
+    from ebayAlert.main import run_searches
+    from ebayAlert.models.sqlmodel import Search, SearchType
+    from ebayAlert.scrapping.klein import KleinItemFactory
+    from ebayAlert.core.settings import settings
+
+    db = Session_klein()
+    db.add_all([SearchType(search_type="KLEIN_BENCH", search_url="/s-bench/{PAGENSEARCH}k0"),
+                SearchType(search_type="EBAY_BENCH", search_url="/b/bench/0")])
+    db.add(Search(status=1, search_type="EBAY_BENCH", search_string=""))
+    for n in range(searches):
+        target_mode = n % 2 == 1
+        db.add(Search(status=1, search_type="KLEIN_BENCH", search_string=f"bench{n} -defekt",
+                      price_low=None if target_mode else 0, price_high=None if target_mode else 100,
+                      price_target=150 if target_mode else None,
+                      zipcodes="50,10000,10037-20,10074" if n % 4 < 2 else None))
+    db.commit()
+    plan = crud_search.get_plan(db)
+
+    # fixtures: pages and geocoder answers as stored by start --record
+    recorder.configure(RECORD, os.path.join(directory, "record"))
+    rand = random.Random(0)
+    for zipcode in common.ZIPCODES:
+        recorder.save_location(zipcode, (rand.uniform(47.5, 54.8), rand.uniform(6.0, 14.9)))
+    for link_model in plan:
+        if link_model.search_type.startswith("EBAY"):
+            recorder.save_page(settings.EBAY_URL_BASE + link_model.url, 200, common.ebay_page(0, 50))
+        else:
+            search_no = int(link_model.search_string.split()[0][len("bench"):])
+            recorder.save_page(KleinItemFactory.generate_url(link_model), 200, common.klein_page(search_no, items))
+    recorder.configure(REPLAY, os.path.join(directory, "record"))
+
+    rows = []
+    for run in ("new", "known"):
+        metrics.reset()
+        start = perf_counter()
+        with redirect_stdout(io.StringIO()):
+            run_searches(db, plan, write_database=True, send_message=True, num_pages=1, verbose=False,
+                         send_outbox=False)
+        total = perf_counter() - start
+        timings, counters = metrics.snapshot()
+        row = {"searches": searches, "run": run, "total": total}
+        for stage in STAGES:
+            row[stage] = sum(seconds for (name, _), (calls, seconds) in timings.items() if name == stage)
+        row["items"] = sum(value for (name, _), value in counters.items() if name == "items_scraped")
+        rows.append(row)
+    db.close()
+    return rows
+
+
+def main():
+    arguments = common.get_arguments(__doc__.strip().splitlines()[0], lambda parser: (
+        parser.add_argument("--sizes", default="10,100,1000", help="numbers of searches, comma separated"),
+        parser.add_argument("--items", type=int, default=25, help="posts per search page"),
+        parser.add_argument("--child", type=int, help=argparse.SUPPRESS),
+    ))
+    if arguments.child:
+        print(json.dumps(run_size(arguments.child, arguments.items)))
+        return
+    rows = []
+    for size in (int(size) for size in arguments.sizes.split(",")):
+        best = None
+        for _ in range(max(1, arguments.repeat)):
+            result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", str(size),
+                                     "--items", str(arguments.items)], capture_output=True, text=True, check=True)
+            size_rows = json.loads(result.stdout.strip().splitlines()[-1])
+            if best is None or sum(row["total"] for row in size_rows) < sum(row["total"] for row in best):
+                best = size_rows
+        rows += best
+    common.report("pipeline", rows, arguments.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+seen-set against DB lookups with 1M stored posts
+
+python benchmarks/bench_seen.py [--posts 1000000] [--lookups 100000] [--json results.jsonl]
+
+- load: reading the fingerprints of all stored posts into the sorted array (once per process)
+- seen-set: contains() for known posts (same price), changed prices and unknown posts
+- db: the lookup add_items_to_db does without the seen-set, one IN query per page of 25 posts
+"""
+import random
+import sqlite3
+
+import common
+
+
+def main():
+    arguments = common.get_arguments(__doc__.strip().splitlines()[0], lambda parser: (
+        parser.add_argument("--posts", type=int, default=1000000, help="posts stored in klein_post"),
+        parser.add_argument("--lookups", type=int, default=100000, help="items looked up per measurement"),
+    ))
+    common.setup()
+    from ebayAlert.core.configs import configs
+    # importing the models with crud_klein creates the tables
+    from ebayAlert.crud.post import crud_klein
+    from ebayAlert.crud.seen import SeenSet, FINGERPRINT_SIZE
+    from ebayAlert.db.db import Session_klein
+
+    rand = random.Random(0)
+    prices = [rand.randint(100, 100000) for _ in range(arguments.posts)]
+    connection = sqlite3.connect(configs.FILE_LOCATION)
+    connection.executemany("INSERT INTO klein_post (post_id, price, price_cents, negotiable, link_id, title) "
+                           "VALUES (?, ?, ?, ?, ?, ?)",
+                           ((post_id, f"{prices[post_id] // 100} €", prices[post_id], post_id % 2, post_id % 150 + 1,
+                             f"post {post_id}") for post_id in range(arguments.posts)))
+    connection.commit()
+    connection.close()
+
+    db = Session_klein()
+    seen = SeenSet(arguments.posts * FINGERPRINT_SIZE)
+    load = common.best_of(lambda: _reload(seen, db), arguments.repeat)
+    assert seen.enabled
+
+    post_ids = [rand.randrange(arguments.posts) for _ in range(arguments.lookups)]
+    known = [(post_id, (prices[post_id], bool(post_id % 2))) for post_id in post_ids]
+    changed = [(post_id, (prices[post_id] + 1, bool(post_id % 2))) for post_id in post_ids]
+    unknown = [(arguments.posts + post_id, (prices[post_id], False)) for post_id in post_ids]
+    rows = [{"measurement": "load", "posts": arguments.posts, "seconds": load, "per_item_us": load / arguments.posts * 1e6,
+             "memory_mb": len(seen.stored) * FINGERPRINT_SIZE / 2 ** 20}]
+    for name, items in (("seen-set known", known), ("seen-set changed", changed), ("seen-set unknown", unknown)):
+        seconds = common.best_of(lambda: [seen.contains(post_id, price) for post_id, price in items], arguments.repeat)
+        rows.append({"measurement": name, "posts": len(items), "seconds": seconds,
+                     "per_item_us": seconds / len(items) * 1e6, "memory_mb": ""})
+    pages = [post_ids[n:n + 25] for n in range(0, len(post_ids), 25)]
+    seconds = common.best_of(lambda: [crud_klein.get_all_in("post_id", page, db) for page in pages], arguments.repeat)
+    rows.append({"measurement": "db per page of 25", "posts": len(post_ids), "seconds": seconds,
+                 "per_item_us": seconds / len(post_ids) * 1e6, "memory_mb": ""})
+    db.close()
+    common.report("seen-set", rows, arguments.json)
+
+
+def _reload(seen, db):
+    seen.loaded = False
+    seen.load(db)
+
+
+if __name__ == "__main__":
+    main()
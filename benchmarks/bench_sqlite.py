@@ -0,0 +1,68 @@
+"""
+inserts per second into the database per SQLITE_PROFILE
+
+python benchmarks/bench_sqlite.py [--rows 2000] [--profiles default,tuned] [--dir DIR] [--json results.jsonl]
+
+every profile writes klein_post rows into a fresh database file, with a connection per session
+(shared False, SQLAlchemy's NullPool connects again after every commit) and with SQLITE_SHARED_CONNECTION:
+- commit per row: CRUDBase.create, one transaction per post as add_items_to_db did
+- bulk: CRUDBase.bulk_create, one transaction for all posts
+the files are created in a temporary directory, --dir places them on the disk to measure (a tmpfs hides the fsyncs)
+"""
+import os
+from itertools import product
+
+import common
+
+
+def main():
+    arguments = common.get_arguments(__doc__.strip().splitlines()[0], lambda parser: (
+        parser.add_argument("--rows", type=int, default=2000, help="posts inserted per measurement"),
+        parser.add_argument("--profiles", default="default,tuned", help="SQLITE_PROFILEs, comma separated"),
+        parser.add_argument("--dir", help="directory of the database files, default temporary"),
+    ))
+    directory = common.setup()
+    from sqlalchemy.orm import sessionmaker
+    from ebayAlert.crud.post import crud_klein
+    from ebayAlert.db.db import Base, create_sqlite_engine
+
+    database_directory = arguments.dir or directory
+    measurement = iter(range(1000000))
+
+    def posts() -> list:
+        start = next(measurement) * arguments.rows
+        return [{"title": f"bench item {n}", "price": f"{n % 300} €", "price_cents": n % 300 * 100,
+                 "negotiable": n % 2 == 1, "post_id": start + n, "link_id": n % 10} for n in range(arguments.rows)]
+
+    rows = []
+    for profile, shared in product(arguments.profiles.split(","), (False, True)):
+        file_location = os.path.join(database_directory, f"bench-sqlite-{profile}.db")
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(file_location + suffix):
+                os.remove(file_location + suffix)
+        engine = create_sqlite_engine(file_location, profile, shared)
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+
+        def commit_per_row():
+            for post in posts():
+                crud_klein.create(post, db)
+
+        def bulk():
+            crud_klein.bulk_create(posts(), db)
+
+        for mode, function in (("commit per row", commit_per_row), ("bulk", bulk)):
+            seconds = common.best_of(function, arguments.repeat)
+            rows.append({"profile": profile, "shared": shared, "mode": mode, "rows": arguments.rows,
+                         "seconds": seconds, "rows_per_s": round(arguments.rows / seconds)})
+        db.close()
+        engine.dispose()
+        if arguments.dir:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(file_location + suffix):
+                    os.remove(file_location + suffix)
+    common.report("sqlite", rows, arguments.json)
+
+
+if __name__ == "__main__":
+    main()
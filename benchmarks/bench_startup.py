@@ -0,0 +1,94 @@
+"""
+startup time of the ebayAlert entry point
+
+python benchmarks/bench_startup.py [--repeat 10] [--importtime 15] [--json results.jsonl]
+
+every run is a fresh interpreter:
+- python: the interpreter alone ("python -c pass"), the part no change of the package can remove
+- import: import ebayAlert.main
+- start --help, send --help: the click commands as called by the ebayAlert script
+total is the wall-clock time of the process, import the time of importing ebayAlert.main inside it,
+connections counts the network connections opened (none are expected, e.g. no ScrapeOPS headers at import)
+--importtime N prints the N slowest modules of "python -X importtime" for start --help
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+from time import perf_counter
+
+import common
+
+COMMANDS = {
+    "import": [],
+    "start --help": ["start", "--help"],
+    "send --help": ["send", "--help"],
+}
+
+
+def child(command: str) -> None:
+    # with an API key a header request at startup would show up as a connection
+    common.setup(SCRAPEOPS_API_KEY="bench")
+    connections = []
+    sys.addaudithook(lambda event, args: connections.append(args) if event == "socket.connect" else None)
+    start = perf_counter()
+    from ebayAlert.main import cli
+    import_seconds = perf_counter() - start
+    if COMMANDS[command]:
+        try:
+            cli(COMMANDS[command], prog_name="ebayAlert")
+        except SystemExit:
+            pass
+    print(json.dumps({"import": import_seconds, "connections": len(connections)}))
+
+
+def run(arguments: list, options: list = None) -> tuple:
+    start = perf_counter()
+    result = subprocess.run([sys.executable] + (options or []) + arguments, capture_output=True, text=True, check=True)
+    return perf_counter() - start, result
+
+
+def print_importtime(count: int) -> None:
+    _, result = run([os.path.abspath(__file__), "--child", "start --help"], ["-X", "importtime"])
+    modules = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                modules.append((int(cumulative), name.rstrip()))
+    print("== slowest imports of start --help (cumulative)")
+    for microseconds, name in sorted(modules, reverse=True)[:count]:
+        print(f"{microseconds / 1000:9.1f} ms  {name}")
+
+
+def main():
+    arguments = common.get_arguments(__doc__.strip().splitlines()[0], lambda parser: (
+        parser.add_argument("--importtime", type=int, metavar="N", help="print the N slowest imports"),
+        parser.add_argument("--child", choices=list(COMMANDS), help=argparse.SUPPRESS),
+    ))
+    if arguments.child:
+        child(arguments.child)
+        return
+    repeat = max(1, arguments.repeat)
+    totals = [run(["-c", "pass"])[0] for _ in range(repeat)]
+    rows = [{"command": "python", "total_median": median(totals), "total_min": min(totals),
+             "import_median": 0.0, "connections": 0}]
+    for command in COMMANDS:
+        totals, imports, connections = [], [], 0
+        for _ in range(repeat):
+            total, result = run([os.path.abspath(__file__), "--child", command])
+            measured = json.loads(result.stdout.strip().splitlines()[-1])
+            totals.append(total)
+            imports.append(measured["import"])
+            connections = max(connections, measured["connections"])
+        rows.append({"command": command, "total_median": median(totals), "total_min": min(totals),
+                     "import_median": median(imports), "connections": connections})
+    common.report("startup", rows, arguments.json)
+    if arguments.importtime:
+        print_importtime(arguments.importtime)
+
+
+if __name__ == "__main__":
+    main()
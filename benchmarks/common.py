@@ -0,0 +1,150 @@
+"""
+shared setup of the benchmarks
+- the package runs with the defaults of configs.default.py (a local configs.py is not read) and overrides,
+  the database and cache files are created in a temporary directory
+- synthetic Kleinanzeigen and Ebay result pages
+- results are printed as a table and appended as a JSON line with the commit (--json FILE) to compare commits
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+from datetime import datetime
+from statistics import median
+from time import perf_counter
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the configs bootstrap is shared with the tests
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+from bootstrap import load_default_configs
+
+ZIPCODES = [f"{10000 + n * 37:05d}" for n in range(200)]
+
+
+def setup(**overrides) -> str:
+    """
+    has to be called before ebayAlert is imported, returns the temporary directory
+    overrides: values of configs, e.g. SQLITE_PROFILE="default"
+    """
+    return load_default_configs("ebayAlert-bench-", **overrides)
+
+
+def get_arguments(description: str, arguments: Callable[[argparse.ArgumentParser], None] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the best one counts")
+    parser.add_argument("--json", metavar="FILE", help="append the results as a JSON line to FILE")
+    if arguments:
+        arguments(parser)
+    return parser.parse_args()
+
+
+def best_of(function: Callable, repeat: int) -> float:
+    """
+    seconds of the fastest of 'repeat' calls
+    """
+    timings = []
+    for _ in range(max(1, repeat)):
+        start = perf_counter()
+        function()
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+
+def median_of(function: Callable, repeat: int) -> float:
+    timings = []
+    for _ in range(max(1, repeat)):
+        start = perf_counter()
+        function()
+        timings.append(perf_counter() - start)
+    return median(timings)
+
+
+def report(benchmark: str, rows: List[Dict], json_file: str = None) -> None:
+    columns = list(rows[0]) if rows else []
+    cells = [[_format(row.get(column)) for column in columns] for row in rows]
+    widths = [max([len(column)] + [len(line[n]) for line in cells]) for n, column in enumerate(columns)]
+    print(f"== {benchmark}")
+    print("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for line in cells:
+        print("  ".join(cell.rjust(width) for cell, width in zip(line, widths)))
+    if json_file:
+        result = {"benchmark": benchmark, "commit": _commit(), "date": datetime.now().isoformat(timespec="seconds"),
+                  "python": sys.version.split()[0], "rows": rows}
+        with open(json_file, "a", encoding="utf-8") as file:
+            file.write(json.dumps(result) + "\n")
+
+
+def klein_page(search_no: int, items: int, page: int = 1, pages: int = 1, seed: int = 0) -> str:
+    """
+    result page of a Kleinanzeigen search like the website's, post IDs are unique per search and page
+    every third item has no shipping (checked against the filter areas)
+    """
+    rand = random.Random(seed * 1000003 + search_no * 101 + page)
+    articles = []
+    for n in range(items):
+        post_id = (search_no * 100 + page) * 1000 + n
+        shipping = "" if n % 3 == 0 else \
+            '<p class="aditem-main--middle--price-shipping--shipping">Versand möglich</p>'
+        articles.append(
+            f'<li class="ad-listitem lazyload-item">'
+            f'<article class="aditem" data-adid="{post_id}" data-href="/s-anzeige/bench{search_no}-{n}/{post_id}">'
+            f'<div class="aditem-image"><a href="/s-anzeige/bench{search_no}-{n}/{post_id}"><img src="x.jpg"></a></div>'
+            f'<div class="aditem-main"><div class="aditem-main--top">'
+            f'<div class="aditem-main--top--left">{rand.choice(ZIPCODES)} Stadt</div>'
+            f'<div class="aditem-main--top--right">Heute, 12:{n % 60:02d}</div></div>'
+            f'<div class="aditem-main--middle"><h2 class="text-module-begin">'
+            f'<a class="ellipsis" href="/s-anzeige/bench{search_no}-{n}/{post_id}">bench{search_no} item {n}&#8203;</a></h2>'
+            f'<p class="aditem-main--middle--description">Beschreibung des Artikels {n} mit etwas Text\n'
+            f'über mehrere Zeilen.</p>'
+            f'<div class="aditem-main--middle--price-shipping">'
+            f'<p class="aditem-main--middle--price-shipping--price">{rand.randint(1, 300)} €{" VB" if n % 2 else ""}</p>'
+            f'{shipping}</div></div></div></article></li>'
+        )
+    pagination = "".join(f"<a>{n}</a>" for n in range(1, pages + 1))
+    return (
+        '<html><head><title>Kleinanzeigen</title>' + '<script>var x = 1;</script>' * 20 + '</head><body>'
+        + '<div class="site-header">' + '<a href="/x">Navigation</a>' * 50 + '</div>'
+        + f'<ul id="srchrslt-adtable" class="itemlist">{"".join(articles)}</ul>'
+        + f'<div class="pagination"><div class="pagination-pages">{pagination}</div></div>'
+        + '<div class="site-footer">' + '<p>Footer</p>' * 50 + '</div></body></html>'
+    )
+
+
+def ebay_page(search_no: int, items: int, seed: int = 0) -> str:
+    """
+    category page of Ebay like the website's
+    """
+    rand = random.Random(seed * 1000003 + search_no)
+    cards = []
+    for n in range(items):
+        post_id = 900000000 + search_no * 1000 + n
+        cards.append(
+            f'<li class="brwrvr__item-card"><div class="brwrvr__item-card__body">'
+            f'<a href="https://www.ebay.de/itm/{post_id}?hash=item{n}">'
+            f'<h3 class="bsig__title"><span class="bsig__title__text">bench{n % 10} ebay {search_no}-{n}</span></h3></a>'
+            f'<span class="bsig__price">EUR {rand.randint(1, 300)},00</span>'
+            f'<span class="s-item__shipping s-item__logisticsCost">Kostenloser Versand</span></div></li>'
+        )
+    return (
+        '<html><head><title>eBay</title>' + '<script>var x = 1;</script>' * 20 + '</head><body>'
+        + '<div class="header">' + '<a href="/x">Navigation</a>' * 50 + '</div>'
+        + f'<ul class="brwrvr__item-results brwrvr__item-results--list">{"".join(cards)}</ul>'
+        + '<div class="footer">' + '<p>Footer</p>' * 50 + '</div></body></html>'
+    )
+
+
+def _format(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.4f}"
+    return str(value)
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
@@ -9,10 +9,45 @@ class Configs:
     LOCATION_FILTER = ""  # example: "distance1,zip11,zip12,...zip1N-dist2,zip21,...,zip2N[...]" or ""
     CHAT_ID = os.environ.get("CHAT_ID") or ""  # ID for receiving Telegram user
     FILE_LOCATION = os.path.join(os.path.expanduser("~"), "kleinanzeigenAlert.db") # Path and name od SQLite database
+    SQLITE_PROFILE = "tuned"  # "tuned" (WAL, synchronous=NORMAL, mmap, larger cache) or "default" (SQLite defaults)
+    # "tuned" needs SQLITE_SHARED_CONNECTION: connecting to a WAL database per session is slower than "default"
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # bytes of the database file memory mapped ("tuned" profile)
+    SQLITE_CACHE_SIZE = -64000  # page cache, negative = KiB ("tuned" profile)
+    SQLITE_CACHED_STATEMENTS = 256  # prepared statements kept per connection
+    SQLITE_SHARED_CONNECTION = True  # keep one connection per thread open instead of connecting per session
     SOURCE_INDICATOR = ""  # OPTIONAL: first characters of telegram message
     SCRAPEOPS_API_KEY = ''
+    SCRAPEOPS_CACHE_FILE = os.path.join(os.path.expanduser("~"), "kleinanzeigenAlert_headers.json")  # cached browser headers
+    SCRAPEOPS_CACHE_TTL = 24 * 60 * 60  # seconds until the cached browser headers are refreshed
     TARGET_MODE_BENEFIT = 0.2  # Example for search mode when expecting at least 20% benefit when reselling
     FORCE_PRIO_GEOLOC = 1  # Force distance anytime and send to priority telegram chat if in range
+    FETCH_WORKERS = 8  # number of searches fetched in parallel
+    FETCH_HOST_CONCURRENCY = 2  # maximum of parallel requests per host
+    FETCH_HOST_RATE = 1.0  # requests per second per host (token bucket), 0 = unlimited
+    FETCH_HOST_BURST = 2  # requests per host allowed at once before rate limiting applies
+    PAGINATION_STOP_RATIO = 0.8  # stop scanning further pages once this share of a page's posts is known, 0 = always scan --depth pages
+    EBAY_RETENTION_DAYS = 30  # unmatched Ebay items older than this are deleted, 0 = kept forever
+    SEEN_SET_MEMORY_MB = 64  # memory for fingerprints of known posts (8 bytes per post) to skip DB lookups, 0 = disabled
+    HTTP_TIMEOUT = (10, 30)  # connect and read timeout in seconds
+    HTTP_RETRIES = 3  # retries on connection errors and 429/5xx responses
+    HTTP_BACKOFF = 1.0  # retry n waits HTTP_BACKOFF * 2^(n-1) seconds
+    HTTP_POOL_SIZE = 10  # kept-alive connections per host
+    HTTP_MAX_RETRY_AFTER = 10  # seconds, longer Retry-After waits of a 429/503 are cut to this
+    TELEGRAM_WORKERS = 4  # threads sending notifications
+    TELEGRAM_CHAT_RATE = 1.0  # messages per second per chat
+    TELEGRAM_GLOBAL_RATE = 30.0  # messages per second per bot
+    TELEGRAM_MAX_ATTEMPTS = 5  # attempts per message before it is given up
+    OUTBOX_MAX_ATTEMPTS = 3  # runs trying to deliver a notification from the outbox, once per run with up to TELEGRAM_MAX_ATTEMPTS requests
+    HTML_PARSER = ""  # "selectolax", "lxml", "html.parser" or "" for the fastest one installed
+    GEOCODE_CACHE_SIZE = 4096  # zipcodes kept in memory, all lookups are stored in the database as well
+    GEOCODE_DATASET = ""  # OPTIONAL: offline zipcode file, "zipcode,latitude,longitude" per line or a GeoNames postal code dump
+    GEOCODE_OFFLINE = False  # never ask Nominatim, only use the dataset and the database
+    GEO_DISTANCE_METHOD = "haversine"  # "haversine" (fast, vectorized with numpy if installed) or "geodesic" (exact)
+    METRICS_JSONL_FILE = ""  # OPTIONAL: append timings and counters of every run as a JSON line to this file
+    METRICS_PROMETHEUS_FILE = ""  # OPTIONAL: write timings and counters of the last run as Prometheus textfile
+    DAEMON_INTERVAL = 60  # minutes between checks of a search in daemon mode, adapted per search
+    DAEMON_MIN_INTERVAL = 5  # minutes, searches with new posts are checked more often down to this
+    DAEMON_MAX_INTERVAL = 360  # minutes, searches without new posts are checked less often up to this
 
 
 configs = Configs()
\ No newline at end of file
@@ -0,0 +1,92 @@
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+from ebayAlert import create_logger
+from ebayAlert.core.configs import configs
+
+log = create_logger(__name__)
+
+
+class CappedRetry(Retry):
+    """
+    follows the Retry-After header of a response for at most max_retry_after seconds
+    a fetching thread holds the request slot of its host while it waits
+    """
+    max_retry_after = None
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is not None and self.max_retry_after is not None:
+            retry_after = min(retry_after, self.max_retry_after)
+        return retry_after
+
+
+class HttpClient:
+    """
+    shared HTTP client for scraping, ScrapeOPS and Telegram
+    - one keep-alive session per thread, connections are pooled per host
+    - retries with exponential backoff on connection errors and 429/5xx (Retry-After is respected up to max_retry_after)
+    - timeouts for connect and read
+    - optional ETag/If-Modified-Since revalidation, an unchanged page is answered with status 304
+    """
+    def __init__(self, timeout, retries: int, backoff: float, pool_size: int,
+                 retry_statuses=(429, 500, 502, 503, 504), max_retry_after: Optional[float] = None):
+        self.timeout = timeout
+        self.max_retry_after = max_retry_after
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.retry_statuses = retry_statuses
+        self.local = threading.local()
+        # url -> conditional request headers of the last response
+        self.validators = {}
+        self.lock = threading.Lock()
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, revalidate: bool = False) -> requests.Response:
+        headers = dict(headers or {})
+        # only ask for encodings that can be decoded (brotli if the brotli package is installed)
+        headers["Accept-Encoding"] = ACCEPT_ENCODING
+        if revalidate:
+            with self.lock:
+                headers.update(self.validators.get(url, {}))
+        response = self._get_session().get(url, headers=headers, timeout=self.timeout)
+        if revalidate and response.status_code == 200:
+            validators = {}
+            if response.headers.get("ETag"):
+                validators["If-None-Match"] = response.headers["ETag"]
+            if response.headers.get("Last-Modified"):
+                validators["If-Modified-Since"] = response.headers["Last-Modified"]
+            with self.lock:
+                self.validators[url] = validators
+        return response
+
+    def post(self, url: str, data: Dict[str, str]) -> requests.Response:
+        # POST is not retried on errors, the caller decides
+        return self._get_session().post(url, data=data, timeout=self.timeout)
+
+    def _get_session(self) -> requests.Session:
+        session = getattr(self.local, "session", None)
+        if session is None:
+            retry = CappedRetry(total=self.retries, backoff_factor=self.backoff, status_forcelist=self.retry_statuses,
+                                respect_retry_after_header=True, raise_on_status=False)
+            retry.max_retry_after = self.max_retry_after
+            adapter = HTTPAdapter(pool_maxsize=self.pool_size, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self.local.session = session
+        return session
+
+
+http_client = HttpClient(configs.HTTP_TIMEOUT, configs.HTTP_RETRIES, configs.HTTP_BACKOFF, configs.HTTP_POOL_SIZE,
+                         max_retry_after=configs.HTTP_MAX_RETRY_AFTER)
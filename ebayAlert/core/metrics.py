@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from time import perf_counter
+from typing import Dict, Optional, Tuple
+
+from ebayAlert import create_logger
+from ebayAlert.core.configs import configs
+
+log = create_logger(__name__)
+
+# stages timed per search
+FETCH = "fetch"
+PARSE = "parse"
+DEDUP = "dedup"
+ENRICHMENT = "enrichment"
+FILTER = "filter"
+GEOCODING = "geocoding"
+TELEGRAM = "telegram"
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "key", "start")
+
+    def __init__(self, metrics: "Metrics", key: Tuple[str, Optional[int]]):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_time(self.key, perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    timings per stage and counters (requests, bytes, cache hits, items) per search of a run
+    written as one JSON line per run (METRICS_JSONL_FILE) and/or a Prometheus textfile (METRICS_PROMETHEUS_FILE)
+    while disabled timer() and count() return at once
+    the search is taken from the current thread (set_search) if not given
+    """
+    def __init__(self, jsonl_file: str = "", prometheus_file: str = ""):
+        self.jsonl_file = jsonl_file
+        self.prometheus_file = prometheus_file
+        self.enabled = bool(jsonl_file or prometheus_file)
+        # (stage, search_id) -> [calls, seconds]
+        self.timings = {}
+        # (name, search_id) -> value
+        self.counters = {}
+        self.started = datetime.now()
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def set_search(self, search_id: Optional[int]) -> None:
+        if self.enabled:
+            self.local.search_id = search_id
+
+    @contextmanager
+    def search(self, search_id: Optional[int]):
+        previous = getattr(self.local, "search_id", None)
+        self.set_search(search_id)
+        try:
+            yield
+        finally:
+            self.set_search(previous)
+
+    def timer(self, stage: str, search_id: Optional[int] = None):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, (stage, search_id if search_id is not None else getattr(self.local, "search_id", None)))
+
+    def count(self, name: str, value: int = 1, search_id: Optional[int] = None) -> None:
+        if not self.enabled:
+            return
+        key = (name, search_id if search_id is not None else getattr(self.local, "search_id", None))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def add_time(self, key: Tuple[str, Optional[int]], seconds: float, calls: int = 1) -> None:
+        with self.lock:
+            timing = self.timings.setdefault(key, [0, 0.0])
+            timing[0] += calls
+            timing[1] += seconds
+
+    def snapshot(self) -> Tuple[Dict, Dict]:
+        with self.lock:
+            return {key: list(value) for key, value in self.timings.items()}, dict(self.counters)
+
+    def merge(self, snapshot: Tuple[Dict, Dict]) -> None:
+        """
+        adds the metrics collected by a worker process
+        """
+        timings, counters = snapshot
+        for key, (calls, seconds) in timings.items():
+            self.add_time(key, seconds, calls)
+        with self.lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def reset(self) -> None:
+        with self.lock:
+            self.timings = {}
+            self.counters = {}
+            self.started = datetime.now()
+
+    def write(self) -> None:
+        """
+        writes the metrics collected since the last reset() and resets them
+        """
+        if not self.enabled:
+            return
+        timings, counters = self.snapshot()
+        ended = datetime.now()
+        if self.jsonl_file:
+            self._write_jsonl(timings, counters, ended)
+        if self.prometheus_file:
+            self._write_prometheus(timings, counters, ended)
+        self.reset()
+
+    def _write_jsonl(self, timings: Dict, counters: Dict, ended: datetime) -> None:
+        searches = {}
+        for (stage, search_id), (calls, seconds) in timings.items():
+            stages = searches.setdefault(str(search_id or "-"), {"stages": {}, "counters": {}})["stages"]
+            stages[stage] = {"calls": calls, "seconds": round(seconds, 6)}
+        for (name, search_id), value in counters.items():
+            searches.setdefault(str(search_id or "-"), {"stages": {}, "counters": {}})["counters"][name] = value
+        run = {"started": self.started.isoformat(), "duration": (ended - self.started).total_seconds(),
+               "searches": searches}
+        try:
+            with open(self.jsonl_file, "a", encoding="utf-8") as file:
+                file.write(json.dumps(run) + "\n")
+        except OSError as e:
+            log.error(e)
+
+    def _write_prometheus(self, timings: Dict, counters: Dict, ended: datetime) -> None:
+        lines = [
+            "# HELP ebayalert_run_duration_seconds Duration of the last run.",
+            "# TYPE ebayalert_run_duration_seconds gauge",
+            f"ebayalert_run_duration_seconds {(ended - self.started).total_seconds()}",
+            "# HELP ebayalert_stage_seconds Time spent per stage and search in the last run.",
+            "# TYPE ebayalert_stage_seconds gauge",
+        ]
+        lines += [f'ebayalert_stage_seconds{{stage="{stage}",search="{search_id or "-"}"}} {seconds:.6f}'
+                  for (stage, search_id), (calls, seconds) in sorted(timings.items(), key=str)]
+        lines += [
+            "# HELP ebayalert_stage_calls Calls per stage and search in the last run.",
+            "# TYPE ebayalert_stage_calls gauge",
+        ]
+        lines += [f'ebayalert_stage_calls{{stage="{stage}",search="{search_id or "-"}"}} {calls}'
+                  for (stage, search_id), (calls, seconds) in sorted(timings.items(), key=str)]
+        lines += [
+            "# HELP ebayalert_count Counters per search in the last run.",
+            "# TYPE ebayalert_count gauge",
+        ]
+        lines += [f'ebayalert_count{{name="{name}",search="{search_id or "-"}"}} {value}'
+                  for (name, search_id), value in sorted(counters.items(), key=str)]
+        # the textfile collector must never read a half written file
+        temp_file = self.prometheus_file + ".tmp"
+        try:
+            with open(temp_file, "w", encoding="utf-8") as file:
+                file.write("\n".join(lines) + "\n")
+            os.replace(temp_file, self.prometheus_file)
+        except OSError as e:
+            log.error(e)
+
+
+metrics = Metrics(configs.METRICS_JSONL_FILE, configs.METRICS_PROMETHEUS_FILE)
@@ -0,0 +1,20 @@
+import re
+from typing import Tuple
+
+# "1.200,50" -> 1.200 euros and 50 cents, "." separates thousands
+_PRICE_PATTERN = re.compile(r"(\d[\d.]*)(?:,(\d{1,2}))?")
+
+
+def parse_price(price) -> Tuple[int, bool]:
+    """
+    price as shown on the websites to (cents, negotiable)
+    "1.200 € VB" -> (120000, True), "12,50 €" -> (1250, False), "VB" or "Zu verschenken" -> (0, ...)
+    """
+    price = str(price or "")
+    cents = 0
+    found = _PRICE_PATTERN.search(price)
+    if found:
+        cents = int(found.group(1).replace(".", "")) * 100
+        if found.group(2):
+            cents += int(found.group(2).ljust(2, "0"))
+    return cents, "VB" in price
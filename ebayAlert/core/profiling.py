@@ -0,0 +1,221 @@
+import cProfile
+import os
+import pstats
+import signal
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from ebayAlert import create_logger
+
+log = create_logger(__name__)
+
+CPROFILE = "cprofile"
+WALL = "wall"
+CPU = "cpu"
+
+# the summary shows the hottest functions of these packages
+SUMMARY_PACKAGES = tuple(os.path.join("ebayAlert", package) + os.sep for package in ("scrapping", "crud", "matching"))
+SUMMARY_SIZE = 5
+
+# from Python 3.12 on a profiler sees all threads and only one can be active at a time,
+# only the main thread switches it, the fetching threads count to the search of the main thread
+SHARED_PROFILE = sys.version_info >= (3, 12)
+
+
+class _RawStats:
+    # stats of a worker process in the form pstats.Stats.add() loads
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class RunProfiler:
+    """
+    start --profile FILE [--profile-mode cprofile|wall|cpu]
+    - cprofile: deterministic profile of every thread, FILE is a pstats dump
+      (Python 3.12+: one profile for all threads, fetching is counted to "(no search)")
+    - wall / cpu: the stacks of all threads are sampled every SAMPLE_INTERVAL seconds of elapsed / CPU time
+      (wall time includes waiting for the network), FILE holds the collapsed stacks for flame graph tools
+    the time is attributed to the search a thread works on (set_search), a summary of the hottest
+    functions in scrapping, crud and matching is printed per search
+    """
+    def __init__(self, sample_interval: float = 0.005):
+        self.mode = None
+        self.file = None
+        self.sample_interval = sample_interval
+        # search ID -> pstats.Stats
+        self.stats = {}
+        # (search ID, stack of (file, line, function) from the outermost frame) -> samples
+        self.samples = {}
+        # thread ident -> search ID, read by the sampling signal handler
+        self.searches = {}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode is not None
+
+    def configure(self, file: Optional[str], mode: Optional[str] = CPROFILE) -> None:
+        """
+        mode None disables profiling, worker processes profile without a file (take_stats)
+        """
+        self.file = file
+        self.mode = mode
+        if self.mode in (WALL, CPU):
+            if not hasattr(signal, "setitimer"):
+                log.error("sampling needs signal.setitimer, using cprofile")
+                self.mode = CPROFILE
+                return
+            timer, signal_number = (signal.ITIMER_REAL, signal.SIGALRM) if self.mode == WALL \
+                else (signal.ITIMER_PROF, signal.SIGPROF)
+            signal.signal(signal_number, self._sample)
+            signal.setitimer(timer, self.sample_interval, self.sample_interval)
+
+    def set_search(self, search_id: Optional[int]) -> None:
+        """
+        following work of the current thread belongs to search_id (None = not search specific)
+        """
+        if not self.enabled:
+            return
+        self.searches[threading.get_ident()] = search_id
+        if self.mode == CPROFILE and _owns_profile():
+            self._stop_profile()
+            profile = cProfile.Profile()
+            self.local.profile = (search_id, profile)
+            profile.enable()
+
+    def stop(self) -> None:
+        """
+        the current thread does not work on a search anymore
+        """
+        if not self.enabled:
+            return
+        self.searches.pop(threading.get_ident(), None)
+        if self.mode == CPROFILE and _owns_profile():
+            self._stop_profile()
+
+    def take_stats(self) -> Dict:
+        """
+        raw stats per search, sent from a worker process to the main process (merge_stats)
+        """
+        with self.lock:
+            stats, self.stats = self.stats, {}
+        return {search_id: search_stats.stats for search_id, search_stats in stats.items()}
+
+    def merge_stats(self, stats: Dict) -> None:
+        for search_id, raw_stats in stats.items():
+            self._add_stats(search_id, _RawStats(raw_stats))
+
+    def finish(self) -> None:
+        """
+        stops profiling, writes FILE and prints the summary
+        """
+        if not self.enabled:
+            return
+        self.stop()
+        if self.mode in (WALL, CPU):
+            signal.setitimer(signal.ITIMER_REAL if self.mode == WALL else signal.ITIMER_PROF, 0)
+            self._write_samples()
+            summary = self._sample_summary()
+        else:
+            self._write_stats()
+            summary = self._stats_summary()
+        print(f"<< Profile ({self.mode}) written to {self.file}")
+        for search_id, functions in sorted(summary.items(), key=lambda entry: str(entry[0])):
+            print(f"<< Hot functions {'ID:' + str(search_id) if search_id is not None else '(no search)'}:")
+            for function, value in functions:
+                print(f"   {value:10.4f}s  {function}" if self.mode == CPROFILE else f"   {value:6d} samples  {function}")
+        self.mode = None
+
+    def _stop_profile(self) -> None:
+        current = getattr(self.local, "profile", None)
+        if current is not None:
+            search_id, profile = current
+            profile.disable()
+            self.local.profile = None
+            self._add_stats(search_id, profile)
+
+    def _add_stats(self, search_id: Optional[int], profile) -> None:
+        with self.lock:
+            if search_id in self.stats:
+                self.stats[search_id].add(profile)
+            else:
+                self.stats[search_id] = pstats.Stats(profile)
+
+    def _write_stats(self) -> None:
+        with self.lock:
+            stats = list(self.stats.values())
+        if not stats:
+            return
+        # the stats per search are still needed for the summary
+        combined = pstats.Stats()
+        for search_stats in stats:
+            combined.add(search_stats)
+        combined.dump_stats(self.file)
+
+    def _stats_summary(self) -> Dict[Optional[int], List[Tuple[str, float]]]:
+        summary = {}
+        with self.lock:
+            for search_id, search_stats in self.stats.items():
+                functions = [(_describe(file, line, name), total_time)
+                             for (file, line, name), (_, _, total_time, _, _) in search_stats.stats.items()
+                             if _in_summary(file)]
+                summary[search_id] = sorted(functions, key=lambda function: -function[1])[:SUMMARY_SIZE]
+        return summary
+
+    def _sample(self, signal_number, frame) -> None:
+        # signal handler, runs in the main thread between two bytecodes
+        sampler = threading.get_ident()
+        for ident, thread_frame in sys._current_frames().items():
+            if ident == sampler:
+                thread_frame = frame
+            stack = []
+            while thread_frame is not None:
+                code = thread_frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                thread_frame = thread_frame.f_back
+            key = (self.searches.get(ident), tuple(reversed(stack)))
+            self.samples[key] = self.samples.get(key, 0) + 1
+
+    def _write_samples(self) -> None:
+        try:
+            with open(self.file, "w", encoding="utf-8") as file:
+                for (search_id, stack), count in self.samples.items():
+                    functions = ";".join(_describe(*function) for function in stack)
+                    file.write(f"search {search_id if search_id is not None else '-'};{functions} {count}\n")
+        except OSError as e:
+            log.error(e)
+
+    def _sample_summary(self) -> Dict[Optional[int], List[Tuple[str, float]]]:
+        # samples in which a function of the summary packages was running (innermost of them)
+        counts = {}
+        for (search_id, stack), count in self.samples.items():
+            for function in reversed(stack):
+                if _in_summary(function[0]):
+                    search_counts = counts.setdefault(search_id, {})
+                    name = _describe(*function)
+                    search_counts[name] = search_counts.get(name, 0) + count
+                    break
+        return {search_id: sorted(search_counts.items(), key=lambda function: -function[1])[:SUMMARY_SIZE]
+                for search_id, search_counts in counts.items()}
+
+
+def _owns_profile() -> bool:
+    return not SHARED_PROFILE or threading.current_thread() is threading.main_thread()
+
+
+def _in_summary(file_name: str) -> bool:
+    return any(package in file_name for package in SUMMARY_PACKAGES)
+
+
+def _describe(file_name: str, line: int, name: str) -> str:
+    # files of this package relative to it, others by their name
+    package = file_name.rfind("ebayAlert" + os.sep)
+    return f"{name} ({file_name[package:] if package >= 0 else os.path.basename(file_name)}:{line})"
+
+
+profiler = RunProfiler()
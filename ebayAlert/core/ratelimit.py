@@ -0,0 +1,68 @@
+import threading
+from contextlib import contextmanager
+from time import monotonic, sleep
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """
+    classic token bucket: 'rate' tokens per second are added up to 'burst' tokens
+    acquire() blocks until a token is available
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated = monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            # no rate limit configured
+            return
+        while True:
+            with self.lock:
+                now = monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            sleep(wait)
+
+
+class HostLimiter:
+    """
+    limits requests per host: at most 'concurrency' requests in flight and 'rate' requests per second
+    """
+    def __init__(self, concurrency: int, rate: float, burst: int):
+        self.concurrency = max(1, int(concurrency))
+        self.rate = rate
+        self.burst = burst
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def share(self, parts: int) -> None:
+        """
+        the limits are split between 'parts' processes, each process limits its own share
+        """
+        with self.lock:
+            self.concurrency = max(1, self.concurrency // parts)
+            self.rate = self.rate / parts
+            self.burst = max(1, int(self.burst) // parts)
+            self.hosts = {}
+
+    def _get_host(self, url: str):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = (threading.BoundedSemaphore(self.concurrency), TokenBucket(self.rate, self.burst))
+            return self.hosts[host]
+
+    @contextmanager
+    def limit(self, url: str):
+        semaphore, bucket = self._get_host(url)
+        with semaphore:
+            bucket.acquire()
+            yield
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Optional, Tuple
+
+from ebayAlert import create_logger
+
+log = create_logger(__name__)
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+class Recorder:
+    """
+    start --record DIR stores the fetched pages and geocoder answers of a run in DIR
+    start --replay DIR answers from DIR instead of asking the websites and the geocoder
+    one JSON file per page (by URL) or zipcode, written atomically as fetching runs in parallel
+    """
+    def __init__(self):
+        self.mode = None
+        self.directory = None
+
+    def configure(self, mode: Optional[str], directory: Optional[str]) -> None:
+        self.mode = mode
+        self.directory = directory
+        if mode == RECORD:
+            for kind in ("pages", "geocoder"):
+                os.makedirs(os.path.join(directory, kind), exist_ok=True)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == RECORD
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def save_page(self, url: str, status_code: int, text: str) -> None:
+        self._write("pages", url, {"url": url, "status_code": status_code, "text": text})
+
+    def load_page(self, url: str) -> Optional[Tuple[int, str]]:
+        """
+        returns (status code, text), None if the page was not recorded
+        """
+        page = self._read("pages", url)
+        if page is None:
+            return None
+        return page["status_code"], page["text"]
+
+    def save_location(self, zipcode: str, point) -> None:
+        self._write("geocoder", zipcode, {"zipcode": zipcode, "point": point})
+
+    def load_location(self, zipcode: str):
+        location = self._read("geocoder", zipcode)
+        if location is None:
+            log.warning(f"zipcode {zipcode} was not recorded")
+            return None
+        return tuple(location["point"]) if location["point"] else None
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.directory, kind, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _write(self, kind: str, key: str, content) -> None:
+        path = self._path(kind, key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(content, file)
+            os.replace(temp_path, path)
+        except OSError as e:
+            log.error(e)
+
+    def _read(self, kind: str, key: str):
+        try:
+            with open(self._path(kind, key), encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+
+recorder = Recorder()
@@ -0,0 +1,80 @@
+import heapq
+from typing import List, Optional
+
+from ebayAlert import create_logger
+
+log = create_logger(__name__)
+
+
+class SearchScheduler:
+    """
+    priority queue of search IDs by the time they are due next (daemon mode)
+    - a search with an interval (minutes) in the DB is checked at that interval
+    - otherwise the interval adapts: halved when the search found new posts, grown by half when it found none,
+      kept when the search failed
+    intervals are handled in seconds here
+    """
+    def __init__(self, interval: float, min_interval: float, max_interval: float):
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        # (due, search_id), entries of removed or rescheduled searches are skipped when popped
+        self.heap = []
+        self.due = {}
+        self.intervals = {}
+        self.fixed = {}
+
+    def sync(self, searches: List, now: float) -> None:
+        """
+        searches: the active searches, new ones are due at once, missing ones are dropped
+        """
+        active = set()
+        for link_model in searches:
+            active.add(link_model.id)
+            if link_model.interval:
+                self.fixed[link_model.id] = link_model.interval * 60
+            else:
+                self.fixed.pop(link_model.id, None)
+            if link_model.id not in self.due:
+                self.intervals[link_model.id] = self.interval
+                self._push(link_model.id, now)
+        for search_id in set(self.due) - active:
+            del self.due[search_id]
+            self.intervals.pop(search_id, None)
+            self.fixed.pop(search_id, None)
+
+    def pop_due(self, now: float) -> List[int]:
+        due_ids = []
+        while self.heap and self.heap[0][0] <= now:
+            due, search_id = heapq.heappop(self.heap)
+            if self.due.get(search_id) == due:
+                # the search stays known but has no entry until it is rescheduled
+                self.due[search_id] = None
+                due_ids.append(search_id)
+        return due_ids
+
+    def next_due(self) -> Optional[float]:
+        while self.heap and self.due.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def reschedule(self, search_id: int, new_posts: Optional[int], now: float) -> float:
+        """
+        new_posts: None if the search failed (e.g. the site was unreachable)
+        returns the interval until the search is due again
+        """
+        if search_id not in self.due:
+            return 0
+        interval = self.fixed.get(search_id)
+        if interval is None:
+            interval = self.intervals.get(search_id, self.interval)
+            if new_posts is not None:
+                interval = interval / 2 if new_posts > 0 else interval * 1.5
+            interval = min(self.max_interval, max(self.min_interval, interval))
+            self.intervals[search_id] = interval
+        self._push(search_id, now + interval)
+        return interval
+
+    def _push(self, search_id: int, due: float) -> None:
+        self.due[search_id] = due
+        heapq.heappush(self.heap, (due, search_id))
@@ -1,17 +1,20 @@
 from contextlib import contextmanager
 from typing import Dict, Any, List, TypeVar, Optional
 
-from sqlalchemy import select, delete
+from sqlalchemy import bindparam, delete, inspect, select, update
 from sqlalchemy.orm import Session
 
 from ebayAlert import create_logger
 from ebayAlert.db.db import Session_klein
-from ebayAlert.models.sqlmodel import Base, Search, SearchType
+from ebayAlert.models.sqlmodel import Base, SearchType, GeoLocation
 
 log = create_logger(__name__)
 
 Model = TypeVar("Model", bound=Base)
 
+# SQLite limits the number of bound parameters per statement
+IN_CHUNK_SIZE = 500
+
 
 @contextmanager
 def get_session():
@@ -30,6 +33,8 @@ def get_session():
 class CRUDBase:
     def __init__(self, model):
         self.model = model
+        # attribute names of the mapped columns, everything else is dropped by _get_clean_dict
+        self.columns = frozenset(column.key for column in inspect(model).column_attrs)
 
     def get_all(self, db: Session) -> Optional[List[Model]]:
         results = db.execute(select(self.model).order_by(
@@ -52,29 +57,71 @@ class CRUDBase:
         results = db.execute(select(self.model).filter_by(**clean_dict)).scalars().all()
         return results
 
-    def create(self, items: Dict[str, Any], db: Session) -> Optional[Model]:
+    def get_all_in(self, key: str, values: List[Any], db: Session) -> Dict[Any, Model]:
+        """
+        fetch all rows where key is one of values with one query per chunk, mapped by key
+        """
+        results = {}
+        column = getattr(self.model, key)
+        values = list(values)
+        for n in range(0, len(values), IN_CHUNK_SIZE):
+            rows = db.execute(select(self.model).where(column.in_(values[n:n + IN_CHUNK_SIZE]))).scalars().all()
+            for row in rows:
+                results[getattr(row, key)] = row
+        return results
+
+    def create(self, items: Dict[str, Any], db: Session, commit: bool = True) -> Optional[Model]:
         clean_dict = self._get_clean_dict(items)
         if not clean_dict:
             return
         item = self.model(**clean_dict)
         db.add(item)
-        db.commit()
-        db.refresh(item)
+        if commit:
+            db.commit()
+            db.refresh(item)
         return item
 
-    def update(self, items: Dict[str, Any], db: Session) -> Optional[Model]:
+    def update(self, items: Dict[str, Any], db: Session, commit: bool = True) -> None:
+        """
+        items: the new values and "identifier", the name of the column identifying the row(s)
+        all columns are updated with one statement
+        """
         identifier = items.get("identifier")
-        clean_dict = self._get_clean_dict(items)
-        if not clean_dict:
+        values = self._get_clean_dict(items)
+        key = values.pop(identifier, None)
+        if not values or key is None:
             return
-        item = self.model(**clean_dict)
-        for x in items:
-            if x != "identifier" and x != identifier:
-                db.query(self.model)\
-                    .filter(getattr(self.model, identifier) == getattr(item, identifier))\
-                    .update({x: getattr(item, x)})
-                db.commit()
-        return item
+        db.execute(update(self.model).where(getattr(self.model, identifier) == key).values(**values)
+                   .execution_options(synchronize_session=False))
+        if commit:
+            db.commit()
+
+    def update_many(self, items: List[Dict[str, Any]], identifier: str, db: Session, commit: bool = True) -> None:
+        """
+        items: rows identified by the column 'identifier', rows with the same columns are updated with executemany
+        the session's objects are not refreshed before the next commit
+        """
+        groups = {}
+        for item in items:
+            values = self._get_clean_dict(item)
+            key = values.pop(identifier, None)
+            if values and key is not None:
+                groups.setdefault(tuple(sorted(values)), []).append(dict(values, b_identifier=key))
+        table = self.model.__table__
+        for columns, rows in groups.items():
+            # bound parameters of the WHERE clause must not be named like the updated columns
+            statement = table.update().where(getattr(table.c, identifier) == bindparam("b_identifier"))\
+                .values({column: bindparam(column) for column in columns})
+            db.connection().execute(statement, rows)
+        if commit:
+            db.commit()
+
+    def bulk_create(self, items: List[Dict[str, Any]], db: Session, commit: bool = True) -> None:
+        mappings = [self._get_clean_dict(item) for item in items]
+        if mappings:
+            db.bulk_insert_mappings(self.model, mappings)
+        if commit:
+            db.commit()
 
     def remove(self, id: int, db: Session) -> Optional[bool]:
         item = db.get(self.model, id)
@@ -87,13 +134,9 @@ class CRUDBase:
         db.execute(delete(self.model).where(self.model.id >= 0).execution_options(synchronize_session="fetch"))
         db.commit()
 
-    def _get_clean_dict(self, obj_in: Dict[str, str]):
-        new_object = {}
-        for key, value in obj_in.items():
-            if key in self.model.__dict__.keys():
-                new_object[key] = value
-        return new_object
+    def _get_clean_dict(self, obj_in: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in obj_in.items() if key in self.columns}
 
 
-crud_search = CRUDBase(Search)
 crud_search_type = CRUDBase(SearchType)
+crud_geo_location = CRUDBase(GeoLocation)
@@ -0,0 +1,42 @@
+import hashlib
+from typing import Dict, List
+
+from sqlalchemy.orm import Session
+
+from ebayAlert.crud.base import CRUDBase
+from ebayAlert.models.sqlmodel import EbayMark
+
+
+def search_hash(link_model) -> str:
+    # everything the ebay matching of a search depends on
+    return hashlib.sha1(f"{link_model.search_type}\n{link_model.search_string}".encode("utf-8")).hexdigest()
+
+
+class CRUDEbayMark(CRUDBase):
+    """
+    high-water mark of the ebay enrichment per search: unmatched ebay items up to last_ebay_id
+    did not match the search, only items inserted after it are matched on the next run
+    """
+    def get_marks(self, searches: List, db: Session) -> Dict[int, int]:
+        """
+        last matched ebay_post.id per search ID, 0 (match all) for new searches and searches edited since
+        """
+        rows = self.get_all_in("search_id", [link_model.id for link_model in searches], db)
+        marks = {}
+        for link_model in searches:
+            row = rows.get(link_model.id)
+            marks[link_model.id] = row.last_ebay_id if row is not None and row.search_hash == search_hash(link_model) else 0
+        return marks
+
+    def set_mark(self, link_model, last_ebay_id: int, db: Session) -> None:
+        """
+        not committed, the mark is stored in the same transaction as the links of the matched items
+        """
+        mark = {"search_id": link_model.id, "search_hash": search_hash(link_model), "last_ebay_id": last_ebay_id}
+        if self.get_by_key({"search_id": link_model.id}, db) is None:
+            self.create(mark, db=db, commit=False)
+        else:
+            self.update(dict(mark, identifier="search_id"), db=db, commit=False)
+
+
+crud_ebay_mark = CRUDEbayMark(EbayMark)
@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from ebayAlert.crud.base import CRUDBase, IN_CHUNK_SIZE
+from ebayAlert.models.sqlmodel import Outbox
+
+
+class CRUDOutbox(CRUDBase):
+    def add_messages(self, messages: List[Dict[str, Any]], db: Session) -> int:
+        """
+        messages with a dedup_key already in the outbox are dropped, nothing is committed here
+        so the messages are written in the same transaction as the posts they belong to
+        """
+        known = set(self.get_all_in("dedup_key", {message["dedup_key"] for message in messages}, db).keys())
+        new_messages = []
+        for message in messages:
+            if message["dedup_key"] not in known:
+                known.add(message["dedup_key"])
+                new_messages.append(message)
+        self.bulk_create(new_messages, db=db, commit=False)
+        return len(new_messages)
+
+    def get_pending(self, db: Session, max_attempts: int) -> List[Outbox]:
+        return db.execute(select(self.model)
+                          .where(self.model.sent.is_(None), self.model.attempts < max_attempts)
+                          .order_by(self.model.id)).scalars().all()
+
+    def mark_sent(self, ids: List[int], db: Session) -> None:
+        for n in range(0, len(ids), IN_CHUNK_SIZE):
+            db.execute(update(self.model).where(self.model.id.in_(ids[n:n + IN_CHUNK_SIZE]))
+                       .values(sent=datetime.now()))
+
+    def add_attempt(self, ids: List[int], db: Session) -> None:
+        for n in range(0, len(ids), IN_CHUNK_SIZE):
+            db.execute(update(self.model).where(self.model.id.in_(ids[n:n + IN_CHUNK_SIZE]))
+                       .values(attempts=self.model.attempts + 1))
+
+
+crud_outbox = CRUDOutbox(Outbox)
@@ -1,9 +1,14 @@
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Optional, Set
 
+from sqlalchemy import delete, func, select
 from sqlalchemy.orm import Session
 from sqlalchemy.util import NoneType
 
+from ebayAlert.core.metrics import metrics
+from ebayAlert.core.price import parse_price
 from ebayAlert.crud.base import CRUDBase
+from ebayAlert.crud.seen import SeenSet
 
 from ebayAlert.models.sqlmodel import KleinPost, EbayPost
 from ebayAlert.scrapping.ebay import EbayItem
@@ -11,42 +16,96 @@ from ebayAlert.scrapping.klein import KleinItem
 
 
 class CRUDKlein(CRUDBase):
-    def add_items_to_db(self, items: List[KleinItem], db: Session, link_id: int, write_database=True) -> List[KleinItem]:
+    def add_items_to_db(self, items: List[KleinItem], db: Session, link_id: int, write_database=True, commit=True,
+                        seen: Optional[SeenSet] = None) -> List[KleinItem]:
+        """
+        seen: posts known with the same price, they are not looked up. Staged additions have to be
+        committed to it together with the session if commit=False
+        """
         new_items = []
         print(f'Found {str(len(items))} items.', end=' ')
         somethingchangedindb = False
         dbchangeslog = ""
+        if seen is not None:
+            found = len(items)
+            items = [item for item in items if not seen.contains(item.id, (item.price_cents, item.negotiable))]
+            metrics.count("seen_hits", found - len(items))
+        # one lookup for all items, posts are compared in memory and written in one transaction
+        known = {post_id: {"id": row.id, "link_id": row.link_id, "price": row.price, "price_cents": row.price_cents,
+                           "negotiable": row.negotiable}
+                 for post_id, row in self.get_all_in("post_id", {item.id for item in items}, db).items()}
+        creates = []
+        updates = {}
         for item in items:
-            db_result = self.get_by_key({"post_id": str(item.id)}, db)
-            if not db_result:
+            post = known.get(item.id)
+            if not post:
                 # new article
                 somethingchangedindb = True
                 dbchangeslog += "C"
                 if write_database:
-                    self.create({"post_id": str(item.id), "price": item.price, "link_id": link_id, "title": item.title}, db=db)
+                    post = {"post_id": item.id, "price": item.price, "price_cents": item.price_cents,
+                            "negotiable": item.negotiable, "link_id": link_id, "title": item.title}
+                    creates.append(post)
+                    # the same article can show up twice when pagination shifts
+                    known[item.id] = post
                 new_items.append(item)
+                if write_database and seen is not None:
+                    seen.add(item.id, (item.price_cents, item.negotiable))
             else:
                 # transition to saving link id in offers
-                if type(getattr(db_result, "link_id")) is NoneType:
+                if type(post["link_id"]) is NoneType:
                     somethingchangedindb = True
                     dbchangeslog += "u"
                     if write_database:
-                        self.update({"identifier": "post_id", "post_id": item.id, "link_id": link_id}, db=db)
+                        self._set_post_field(post, updates, "link_id", link_id)
                 # there was a different price before, update it and inform
-                old_price = str(getattr(db_result, "price"))
-                if old_price != item.price:
+                old_price = (post["price_cents"], bool(post["negotiable"]))
+                if post["price_cents"] is None:
+                    old_price = parse_price(post["price"])
+                price = (item.price_cents, item.negotiable)
+                price_changed = old_price != price
+                if price_changed:
+                    item.old_price = str(post["price"])
                     somethingchangedindb = True
                     dbchangeslog += 'U'
                     if write_database:
-                        self.update({"identifier": "post_id", "post_id": item.id, "price": item.price}, db=db)
-                    item.old_price = old_price
+                        self._set_post_field(post, updates, "price", item.price)
+                        self._set_post_field(post, updates, "price_cents", item.price_cents)
+                        self._set_post_field(post, updates, "negotiable", item.negotiable)
                     new_items.append(item)
+                if write_database and seen is not None:
+                    seen.add(item.id, price, old_price if price_changed else None)
+        if creates or updates:
+            self.bulk_create(creates, db=db, commit=False)
+            self.update_many(list(updates.values()), identifier="id", db=db, commit=False)
+            if commit:
+                db.commit()
+        if commit and seen is not None:
+            seen.commit()
         if somethingchangedindb is True:
             print("Changes in DB:", dbchangeslog, end='')
         else:
             print('Nothing new for DB.', end='')
         return new_items
 
+    def get_post_ids_by_search(self, link_ids: List[int], db: Session) -> Dict[int, Set[int]]:
+        """
+        post IDs stored per search, searches without posts are not in the result
+        """
+        post_ids = {}
+        if link_ids:
+            rows = db.execute(select(self.model.link_id, self.model.post_id).where(self.model.link_id.in_(link_ids)))
+            for link_id, post_id in rows:
+                post_ids.setdefault(link_id, set()).add(post_id)
+        return post_ids
+
+    @staticmethod
+    def _set_post_field(post, updates, key, value):
+        post[key] = value
+        if post.get("id") is not None:
+            # posts created in this batch are inserted with their final values
+            updates.setdefault(post["id"], {"id": post["id"]})[key] = value
+
 
 class CRUDEbay(CRUDBase):
     def add_items_to_db(self, items: List[EbayItem], search_type, db: Session, write_database=True) -> List[EbayItem]:
@@ -54,22 +113,46 @@ class CRUDEbay(CRUDBase):
         print(f'Found {str(len(items))} items.', end=' ')
         somethingchangedindb = False
         dbchangeslog = ""
+        known = set(self.get_all_in("post_id", {item.id for item in items}, db).keys())
+        creates = []
         for item in items:
             # print(f'post_id: {str(item.id)}, price: {item.price}, title: {item.title}')
-            db_result = self.get_by_key({"post_id": str(item.id)}, db)
-            if not db_result:
+            if item.id not in known:
                 # new article
                 somethingchangedindb = True
                 dbchangeslog += "E"
                 if write_database:
-                    self.create({"post_id": str(item.id), "search_type": search_type, "price": item.price, "title": item.title, "shipping": item.shipping}, db=db)
+                    creates.append({"post_id": item.id, "search_type": search_type, "price": item.price, "price_cents": item.price_cents,
+                                    "negotiable": item.negotiable, "title": item.title, "shipping": item.shipping})
+                    known.add(item.id)
                 new_items.append(item)
+        if creates:
+            self.bulk_create(creates, db=db)
         if somethingchangedindb is True:
             print("Changes in DB (Ebay):", dbchangeslog)
         else:
             print('No new Ebay items.')
         return new_items
 
+    def get_unmatched(self, search_type, after_id: int, db: Session) -> List[EbayPost]:
+        """
+        items of the search type not linked to a search, inserted after the item with ID after_id
+        """
+        return db.execute(select(self.model).where(self.model.search_type == search_type, self.model.link_id.is_(None),
+                                                   self.model.id > after_id)).scalars().all()
+
+    def get_last_id(self, search_type, db: Session) -> int:
+        return db.execute(select(func.max(self.model.id)).where(self.model.search_type == search_type)).scalar() or 0
+
+    def delete_unmatched_before(self, date: datetime, db: Session) -> int:
+        """
+        removes items no search matched until date (UTC, like the date column), returns their number
+        """
+        result = db.execute(delete(self.model).where(self.model.link_id.is_(None), self.model.date < date)
+                            .execution_options(synchronize_session=False))
+        db.commit()
+        return result.rowcount
+
 
 crud_ebay = CRUDEbay(EbayPost)
 crud_klein = CRUDKlein(KleinPost)
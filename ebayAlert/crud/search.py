@@ -0,0 +1,86 @@
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from ebayAlert import create_logger
+from ebayAlert.crud.base import CRUDBase
+from ebayAlert.models.sqlmodel import Search, SearchType, TableVersion
+
+log = create_logger(__name__)
+
+
+class SearchPlan(NamedTuple):
+    """
+    an active search with the URL of its search type, read once per run (or plan version in daemon mode)
+    immutable and picklable, it is handed to the fetching threads and processes
+    """
+    id: int
+    status: int
+    search_type: str
+    search_string: str
+    price_low: Optional[int]
+    price_high: Optional[int]
+    price_target: Optional[int]
+    price_info: Optional[str]
+    zipcodes: Optional[str]
+    chat_id: Optional[int]
+    interval: Optional[int]
+    url: str
+
+
+class CRUDSearch(CRUDBase):
+    def __init__(self, model):
+        super().__init__(model)
+        self.cached_plan = None
+        self.cached_version = None
+
+    def get_plan(self, db: Session, exclusive_id=False) -> Tuple[SearchPlan, ...]:
+        """
+        active searches joined with their search type in one query
+        status: 0 = disabled, 1 = active, 2 = silent (KLEIN only, EBAY searches have no silent mode)
+        a NULL status counts as not disabled (KLEIN) and not active (EBAY)
+        ordered by search type, EBAY searches come before the KLEIN searches they enrich
+        """
+        # search_type is not unique, the first row of a duplicated search type is used
+        first_types = select(func.min(SearchType.id)).group_by(SearchType.search_type)
+        statement = select(Search, SearchType.search_url)\
+            .join(SearchType, and_(SearchType.search_type == Search.search_type, SearchType.id.in_(first_types)))\
+            .where(or_(and_(Search.search_type.like("KLEIN%"), or_(Search.status.is_(None), Search.status != 0)),
+                       and_(Search.search_type.like("EBAY%"), Search.status == 1)))\
+            .order_by(Search.search_type.asc(), Search.price_low.desc(), Search.price_target.desc())
+        if exclusive_id is not False:
+            statement = statement.where(Search.id == exclusive_id)
+        return tuple(SearchPlan(
+            id=search.id,
+            status=search.status,
+            search_type=search.search_type,
+            search_string=search.search_string,
+            price_low=search.price_low,
+            price_high=search.price_high,
+            price_target=search.price_target,
+            price_info=search.price_info,
+            zipcodes=search.zipcodes,
+            chat_id=search.chat_id,
+            interval=search.interval,
+            url=search_url,
+        ) for search, search_url in db.execute(statement))
+
+    def get_cached_plan(self, db: Session) -> Tuple[SearchPlan, ...]:
+        """
+        plan of all active searches, loaded again only after the search or search_type table changed
+        """
+        version = self.get_version(db)
+        if self.cached_plan is None or version != self.cached_version:
+            self.cached_plan = self.get_plan(db)
+            self.cached_version = version
+        return self.cached_plan
+
+    @staticmethod
+    def get_version(db: Session) -> Tuple:
+        rows = db.execute(select(TableVersion.table_name, TableVersion.version)
+                          .where(TableVersion.table_name.in_(["search", "search_type"])))
+        return tuple(sorted(rows))
+
+
+crud_search = CRUDSearch(Search)
@@ -0,0 +1,89 @@
+from array import array
+from bisect import bisect_left
+from typing import Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ebayAlert import create_logger
+from ebayAlert.core.configs import configs
+from ebayAlert.models.sqlmodel import KleinPost
+
+log = create_logger(__name__)
+
+# 8 bytes per stored post in the sorted array
+FINGERPRINT_SIZE = 8
+
+
+def fingerprint(post_id: int, price: Tuple[int, bool]) -> int:
+    """
+    price: (price_cents, negotiable)
+    """
+    return hash((post_id, price)) & 0xFFFFFFFFFFFFFFFF
+
+
+class SeenSet:
+    """
+    fingerprints of the stored (post_id, (price_cents, negotiable)) pairs of klein_post, loaded once per process
+    an item in the set is known with the same price and linked to a search, the DB is not asked for it
+    - stored posts are kept in a sorted array (8 bytes each), posts of this process in a set
+    - additions are staged and only become visible after commit(), a rolled back post is looked up again
+    - disabled (nothing is seen) if the posts would not fit into memory_budget bytes
+    """
+    def __init__(self, memory_budget: int):
+        self.memory_budget = memory_budget
+        self.loaded = False
+        self.enabled = False
+        self.stored = array("Q")
+        self.added = set()
+        self.removed = set()
+        self.pending = []
+
+    def load(self, db: Session) -> None:
+        if self.loaded:
+            return
+        self.loaded = True
+        if self.memory_budget <= 0:
+            return
+        # posts without link_id are updated when found again
+        linked = KleinPost.link_id.isnot(None)
+        count = db.execute(select(func.count()).select_from(KleinPost).where(linked)).scalar()
+        if count * FINGERPRINT_SIZE > self.memory_budget:
+            log.warning(f"{count} stored posts exceed the seen-set memory budget, every item is looked up in the DB")
+            print(f"<< Seen-set disabled: {count} posts do not fit into {self.memory_budget // 2 ** 20} MB.")
+            return
+        rows = db.execute(select(KleinPost.post_id, KleinPost.price_cents, KleinPost.negotiable).where(linked))
+        self.stored = array("Q", sorted(fingerprint(post_id, (price_cents, bool(negotiable)))
+                                        for post_id, price_cents, negotiable in rows))
+        self.enabled = True
+
+    def contains(self, post_id: int, price: Tuple[int, bool]) -> bool:
+        if not self.enabled:
+            return False
+        key = fingerprint(post_id, price)
+        if key in self.added:
+            return True
+        if key in self.removed:
+            return False
+        n = bisect_left(self.stored, key)
+        return n < len(self.stored) and self.stored[n] == key
+
+    def add(self, post_id: int, price: Tuple[int, bool], old_price: Optional[Tuple[int, bool]] = None) -> None:
+        if self.enabled:
+            self.pending.append((fingerprint(post_id, price), None if old_price is None else fingerprint(post_id, old_price)))
+
+    def commit(self) -> None:
+        for key, old_key in self.pending:
+            if old_key is not None:
+                # the post can come back at its old price
+                self.added.discard(old_key)
+                self.removed.add(old_key)
+            self.removed.discard(key)
+            self.added.add(key)
+        self.pending = []
+
+    def rollback(self) -> None:
+        self.pending = []
+
+
+seen_posts = SeenSet(configs.SEEN_SET_MEMORY_MB * 2 ** 20)
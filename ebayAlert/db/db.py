@@ -1,6 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import SingletonThreadPool
 
 from ebayAlert import create_logger
 from ebayAlert.core.configs import configs
@@ -8,7 +9,45 @@ from ebayAlert.core.configs import configs
 
 log = create_logger(__name__)
 
-engine = create_engine(f'sqlite:///{configs.FILE_LOCATION}', echo=False)
+# PRAGMAs set on every new connection per SQLITE_PROFILE
+SQLITE_PROFILES = {
+    "default": {},
+    # WAL: readers do not block the writer, a commit appends to the log instead of rewriting pages
+    # synchronous=NORMAL: no fsync per commit in WAL mode, a power loss can only lose the last commits
+    # opening a WAL database costs more than the PRAGMAs, the connection has to be kept (SQLITE_SHARED_CONNECTION)
+    "tuned": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": configs.SQLITE_MMAP_SIZE,
+        "cache_size": configs.SQLITE_CACHE_SIZE,
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def create_sqlite_engine(file_location: str, profile: str, shared: bool):
+    pragmas = SQLITE_PROFILES.get(profile)
+    if pragmas is None:
+        log.error(f"unknown SQLITE_PROFILE {profile}, using default")
+        pragmas = {}
+    options = {}
+    if shared:
+        # one connection per thread kept open, page cache and prepared statements survive the sessions
+        options["poolclass"] = SingletonThreadPool
+    sqlite_engine = create_engine(f'sqlite:///{file_location}', echo=False,
+                                  connect_args={"cached_statements": configs.SQLITE_CACHED_STATEMENTS}, **options)
+
+    @event.listens_for(sqlite_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return sqlite_engine
+
+
+engine = create_sqlite_engine(configs.FILE_LOCATION, configs.SQLITE_PROFILE, configs.SQLITE_SHARED_CONNECTION)
 
 Base = declarative_base()
 
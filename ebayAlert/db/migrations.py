@@ -0,0 +1,109 @@
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import MetaData, Table
+
+from ebayAlert import create_logger
+from ebayAlert.core.price import parse_price
+
+log = create_logger(__name__)
+
+
+def migrate(engine: Engine, metadata: MetaData,
+            backfills: Optional[Dict[str, Callable[[Connection, Table], None]]] = None,
+            versioned: Optional[List[str]] = None) -> None:
+    """
+    Base.metadata.create_all() only creates missing tables, existing databases are brought up to date here
+    backfills: "table.column" -> function filling the rows of an added column
+    versioned: tables whose changes are counted in table "table_version" (by triggers)
+    """
+    backfills = backfills or {}
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in metadata.sorted_tables:
+            added = _add_missing_columns(connection, table, {column["name"] for column in inspector.get_columns(table.name)})
+            for backfill in {backfills[key] for key in (f"{table.name}.{column}" for column in added) if key in backfills}:
+                backfill(connection, table)
+            if table.dialect_options["sqlite"]["autoincrement"] and _enable_autoincrement(connection, table, inspector):
+                # the table and its indexes were created again
+                continue
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                if index.unique:
+                    _remove_duplicates(connection, table, [column.name for column in index.columns])
+                log.info(f"creating index {index.name}")
+                index.create(connection)
+        for table_name in versioned or []:
+            _create_version_triggers(connection, table_name)
+
+
+def backfill_prices(connection: Connection, table: Table) -> None:
+    # price_cents and negotiable parsed from the price shown on the website
+    rows = connection.execute(text(f"SELECT id, price FROM {table.name} WHERE price_cents IS NULL")).fetchall()
+    updates = []
+    for row_id, price in rows:
+        price_cents, negotiable = parse_price(price)
+        updates.append({"id": row_id, "price_cents": price_cents, "negotiable": negotiable})
+    if updates:
+        log.info(f"parsing {len(updates)} prices of {table.name}")
+        connection.execute(text(f"UPDATE {table.name} SET price_cents = :price_cents, negotiable = :negotiable WHERE id = :id"),
+                           updates)
+
+
+def _add_missing_columns(connection: Connection, table: Table, existing_columns) -> List[str]:
+    # SQLite can only add nullable columns without constraints, new columns are written that way
+    added = []
+    for column in table.columns:
+        if column.name in existing_columns:
+            continue
+        log.info(f"adding column {table.name}.{column.name}")
+        column_type = column.type.compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        added.append(column.name)
+    return added
+
+
+def _enable_autoincrement(connection: Connection, table: Table, inspector) -> bool:
+    # SQLite can not add AUTOINCREMENT to a table, it is copied to a new one
+    create_sql = connection.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                                    {"name": table.name}).scalar()
+    if create_sql is None or "AUTOINCREMENT" in create_sql.upper():
+        return False
+    log.info(f"rebuilding {table.name} with AUTOINCREMENT")
+    # the indexes keep their names when the table is renamed, they are created again with the new table
+    for index in inspector.get_indexes(table.name):
+        connection.execute(text(f"DROP INDEX IF EXISTS {index['name']}"))
+    connection.execute(text(f"ALTER TABLE {table.name} RENAME TO {table.name}_old"))
+    table.create(connection)
+    columns = ", ".join(column.name for column in table.columns)
+    # duplicates of unique columns are dropped, the first (oldest) row is kept
+    connection.execute(text(f"INSERT OR IGNORE INTO {table.name} ({columns}) "
+                            f"SELECT {columns} FROM {table.name}_old ORDER BY id"))
+    connection.execute(text(f"DROP TABLE {table.name}_old"))
+    return True
+
+
+def _create_version_triggers(connection: Connection, table_name: str) -> None:
+    # any change of the table, also by other programs, increments its version
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table_name}_version_{event.lower()} AFTER {event} ON {table_name} BEGIN "
+            f"INSERT OR IGNORE INTO table_version (table_name, version) VALUES ('{table_name}', 0); "
+            f"UPDATE table_version SET version = version + 1 WHERE table_name = '{table_name}'; "
+            f"END"
+        ))
+
+
+def _remove_duplicates(connection: Connection, table: Table, columns) -> None:
+    # a unique index can not be built on duplicates, the first (oldest) row is kept
+    not_null = " AND ".join(f"{column} IS NOT NULL" for column in columns)
+    group_by = ", ".join(columns)
+    result = connection.execute(text(
+        f"DELETE FROM {table.name} WHERE {not_null} AND id NOT IN "
+        f"(SELECT MIN(id) FROM {table.name} WHERE {not_null} GROUP BY {group_by})"
+    ))
+    if result.rowcount:
+        log.warning(f"removed {result.rowcount} duplicate rows from {table.name} before indexing {group_by}")
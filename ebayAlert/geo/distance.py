@@ -0,0 +1,75 @@
+import math
+from typing import List, Optional, Tuple
+
+from geopy import distance
+
+from ebayAlert import create_logger
+
+log = create_logger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    log.info("numpy not installed, distances are calculated one by one")
+
+Point = Tuple[float, float]
+
+# mean earth radius as used by geopy
+EARTH_RADIUS_KM = 6371.0088
+
+
+class AreaFilter:
+    """
+    all zipcodes of the filter areas as rows of (latitude, longitude, max distance)
+    in_range() checks all items of a search against all rows at once
+    method "haversine" (fast, vectorized with numpy) or "geodesic" (exact, geopy per pair)
+    """
+    def __init__(self, areas: List[Tuple[int, List[Point]]], method: str = "haversine"):
+        self.method = method
+        self.rows = [(point[0], point[1], max_distance) for max_distance, points in areas for point in points]
+        self.array = None
+        if np is not None and self.rows:
+            self.array = np.radians(np.array(self.rows, dtype=float)[:, :2])
+            self.max_distances = np.array([row[2] for row in self.rows], dtype=float)
+
+    def in_range(self, points: List[Optional[Point]]) -> List[bool]:
+        """
+        an item is in range if its rounded distance to any zipcode is within the max distance of that zipcode's area
+        items without location are never in range
+        """
+        results = [False] * len(points)
+        located = [n for n, point in enumerate(points) if point]
+        if not located or not self.rows:
+            return results
+        if self.method == "geodesic":
+            for n in located:
+                results[n] = any(round(distance.distance(points[n], row[:2]).km) <= row[2] for row in self.rows)
+        elif self.array is not None:
+            items = np.radians(np.array([points[n] for n in located], dtype=float))
+            distances = haversine_matrix(items, self.array)
+            hits = (np.round(distances) <= self.max_distances).any(axis=1)
+            for n, hit in zip(located, hits):
+                results[n] = bool(hit)
+        else:
+            for n in located:
+                results[n] = any(round(haversine(points[n], row[:2])) <= row[2] for row in self.rows)
+        return results
+
+
+def haversine_matrix(items, areas):
+    """
+    items (N, 2) and areas (M, 2) as radians, returns (N, M) distances in km
+    """
+    lat1 = items[:, 0][:, np.newaxis]
+    lon1 = items[:, 1][:, np.newaxis]
+    lat2 = areas[:, 0][np.newaxis, :]
+    lon2 = areas[:, 1][np.newaxis, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def haversine(point1: Point, point2: Point) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (point1[0], point1[1], point2[0], point2[1]))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
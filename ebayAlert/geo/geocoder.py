@@ -0,0 +1,148 @@
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from geopy.exc import GeopyError
+from geopy.extra.rate_limiter import RateLimiter
+from geopy.geocoders import Nominatim
+from sqlalchemy.orm import Session
+
+from ebayAlert import create_logger
+from ebayAlert.core.configs import configs
+from ebayAlert.core.metrics import metrics
+from ebayAlert.core.replay import recorder
+from ebayAlert.crud.base import crud_geo_location
+
+log = create_logger(__name__)
+
+Point = Tuple[float, float]
+
+
+class ZipcodeGeocoder:
+    """
+    resolves zipcodes to (latitude, longitude)
+    lookup order: in-process LRU, offline dataset, geo_location table, Nominatim (result is stored in geo_location)
+    store: Nominatim results are added to the session (not with start -n)
+    zipcodes failing with a geocoder error are not cached, they are looked up again next time
+    """
+    def __init__(self, cache_size: int, dataset: str = "", offline: bool = False):
+        self.cache = OrderedDict()
+        self.cache_size = max(1, int(cache_size))
+        self.dataset_file = dataset
+        self.dataset = None
+        self.offline = offline
+        self.nominatim = None
+        # parsed filter areas by their setting string, resolved once per run
+        self.areas = {}
+
+    def locate(self, zipcode: str, db: Session, store: bool = True) -> Optional[Point]:
+        return self._resolve(zipcode, db, store)[0]
+
+    def locate_item(self, location: str, db: Session, store: bool = True) -> Optional[Point]:
+        # item location looks like "12345 Town"
+        zipcodes = re.findall(r'\d+', location)
+        if zipcodes:
+            return self.locate(zipcodes[0], db, store)
+
+    def get_areas(self, areas_setting: str, db: Session, store: bool = True) -> List[Tuple[int, List[Point]]]:
+        """
+        areas setting looks like this: dist1,zip11,zip12,..,zip1N-dist2,zip21..
+        returns [(max distance, [points of zipcodes]), ...], zipcodes that can not be found are left out
+        """
+        if areas_setting in self.areas:
+            return self.areas[areas_setting]
+        areas = []
+        complete = True
+        for distancegroup in areas_setting.split('-') if areas_setting else []:
+            distancegroup = distancegroup.split(',')
+            points = []
+            for zipcode in distancegroup[1:]:
+                point, final = self._resolve(zipcode, db, store)
+                complete = complete and final
+                if point:
+                    points.append(point)
+            areas.append((int(distancegroup[0]), points))
+        if complete:
+            self.areas[areas_setting] = areas
+        return areas
+
+    def _resolve(self, zipcode: str, db: Session, store: bool) -> Tuple[Optional[Point], bool]:
+        # returns the point and if it is final (False after a geocoder error)
+        zipcode = zipcode.strip()
+        if zipcode in self.cache:
+            metrics.count("geocode_cache_hits")
+            self.cache.move_to_end(zipcode)
+            return self.cache[zipcode], True
+        metrics.count("geocode_lookups")
+        if recorder.replaying:
+            point, final = recorder.load_location(zipcode), True
+        else:
+            point, final = self._locate(zipcode, db, store)
+            if recorder.recording and final:
+                recorder.save_location(zipcode, point)
+        if final:
+            self.cache[zipcode] = point
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return point, final
+
+    def _locate(self, zipcode: str, db: Session, store: bool) -> Tuple[Optional[Point], bool]:
+        dataset = self._get_dataset()
+        if zipcode in dataset:
+            return dataset[zipcode], True
+        db_result = crud_geo_location.get_by_key({"zipcode": zipcode}, db)
+        if db_result:
+            if db_result.latitude is None:
+                return None, True
+            return (db_result.latitude, db_result.longitude), True
+        if self.offline:
+            return None, True
+        try:
+            location = self._get_nominatim()(zipcode)
+        except GeopyError as e:
+            # not stored, try again next time
+            log.error(e)
+            return None, False
+        point = (location.latitude, location.longitude) if location else None
+        if store:
+            crud_geo_location.create({"zipcode": zipcode,
+                                      "latitude": point[0] if point else None,
+                                      "longitude": point[1] if point else None}, db=db, commit=False)
+        return point, True
+
+    def _get_nominatim(self):
+        if self.nominatim is None:
+            geocoder = Nominatim(user_agent="cyberpete2244/kleinanzeigenAlert")
+            # Nominatim usage policy: max 1 request per second
+            self.nominatim = RateLimiter(geocoder.geocode, min_delay_seconds=1)
+        return self.nominatim
+
+    def _get_dataset(self) -> Dict[str, Point]:
+        if self.dataset is None:
+            self.dataset = {}
+            if self.dataset_file:
+                self.dataset = load_dataset(self.dataset_file)
+        return self.dataset
+
+
+def load_dataset(file_name: str) -> Dict[str, Point]:
+    """
+    reads "zipcode,latitude,longitude" lines or a GeoNames postal code dump (tab separated, lat/lon in column 10/11)
+    """
+    dataset = {}
+    with open(file_name, encoding="utf-8") as dataset_file:
+        for line in dataset_file:
+            row = line.rstrip("\n").split('\t' if '\t' in line else ',')
+            try:
+                if len(row) >= 11:
+                    dataset.setdefault(row[1].strip(), (float(row[9]), float(row[10])))
+                elif len(row) >= 3:
+                    dataset.setdefault(row[0].strip(), (float(row[1]), float(row[2])))
+            except ValueError:
+                # header line
+                continue
+    log.info(f"loaded {len(dataset)} zipcodes from {file_name}")
+    return dataset
+
+
+geocoder = ZipcodeGeocoder(configs.GEOCODE_CACHE_SIZE, configs.GEOCODE_DATASET, configs.GEOCODE_OFFLINE)
@@ -1,22 +1,34 @@
-import re
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
+from time import monotonic, sleep
+from typing import Dict, List
 
 from sqlalchemy.orm import Session
 from sqlalchemy.util import NoneType
 
-from geopy.geocoders import Nominatim
-from geopy import distance
-
 from ebayAlert import create_logger
 from ebayAlert.core.configs import configs
+from ebayAlert.core.metrics import metrics, DEDUP, ENRICHMENT, FILTER, GEOCODING
+from ebayAlert.core.price import parse_price
+from ebayAlert.core.profiling import profiler, CPROFILE, CPU, WALL
+from ebayAlert.core.replay import recorder, RECORD, REPLAY
+from ebayAlert.core.scheduler import SearchScheduler
 from ebayAlert.core.settings import settings
-from ebayAlert.crud.base import crud_search, get_session, crud_search_type
+from ebayAlert.crud.base import get_session
+from ebayAlert.crud.enrichment import crud_ebay_mark
+from ebayAlert.crud.outbox import crud_outbox
 from ebayAlert.crud.post import crud_klein, crud_ebay
+from ebayAlert.crud.search import crud_search
+from ebayAlert.crud.seen import seen_posts
+from ebayAlert.geo.distance import AreaFilter
+from ebayAlert.geo.geocoder import geocoder
+from ebayAlert.matching.index import TitleIndex
+from ebayAlert.matching.query import get_query
+from ebayAlert.matching.thresholds import get_thresholds
 from ebayAlert.models.sqlmodel import EbayPost
-from ebayAlert.scrapping.ebay import EbayItemFactory
-from ebayAlert.scrapping.klein import KleinItemFactory
-from ebayAlert.telegram.telegram import send_formatted_message
+from ebayAlert.scrapping.fetcher import fetch_all, limit_processes
+from ebayAlert.telegram.outbound import telegram_queue, outbox_sender
+from ebayAlert.telegram.telegram import send_formatted_message, format_message
 from ebayAlert.telegram.telegram import send_test_message
 
 log = create_logger(__name__)
@@ -40,7 +52,15 @@ def cli() -> BaseCommand:
 @click.option("-v", "--verbose", is_flag=True, help="Show more near matches.")
 @click.option("-e", "--exclusive", 'exclusive', metavar="<link id>", help="Run only one search by ID.")
 @click.option("-d", "--depth", 'depth', metavar="<pages n>", help="When available (on Kleinanzeigen), scan n pages of pagination (default 1).")
-def start(silent, testtelegram, nonperm, exclusive, depth, verbose):
+@click.option("-o", "--outbox", is_flag=True, help="Only store notifications in the outbox, 'send' delivers them.")
+@click.option("-w", "--workers", 'workers', metavar="<processes n>", help="Fetch and parse in n processes (default 1 = threads only, at most FETCH_HOST_CONCURRENCY).")
+@click.option("--record", 'record', metavar="<directory>", help="Store fetched pages and geocoder answers in directory.")
+@click.option("--replay", 'replay', metavar="<directory>", help="Use pages and geocoder answers stored by --record instead of the websites.")
+@click.option("--profile", 'profile', metavar="<file>", help="Profile the run, write the profile to file and print the hot functions per search.")
+@click.option("--profile-mode", 'profile_mode', type=click.Choice([CPROFILE, WALL, CPU]), default=CPROFILE, show_default=True,
+              help="cprofile: pstats dump, wall / cpu: sampled collapsed stacks of elapsed / CPU time.")
+def start(silent, testtelegram, nonperm, exclusive, depth, verbose, outbox, workers, record, replay, profile,
+          profile_mode):
     """
     cli related to the main package. Fetch new posts and send notifications.
     """
@@ -51,6 +71,8 @@ def start(silent, testtelegram, nonperm, exclusive, depth, verbose):
     verbose_mode = False
     num_pages = 1
     exclusive_id = False
+    send_outbox = True
+    processes = 1
 
     starttime = datetime.now()
     print("----------------------------------------------------------------------------------")
@@ -70,13 +92,37 @@ def start(silent, testtelegram, nonperm, exclusive, depth, verbose):
     if verbose:
         print(">> Showing near misses also.")
         verbose_mode = True
+    if outbox:
+        print(">> Notifications are stored in outbox only.")
+        send_outbox = False
+    if workers:
+        processes = limit_processes(int(workers))
+        print(f">> Fetching in {processes} processes.")
+    if record and replay:
+        raise click.UsageError("--record and --replay can not be used together.")
+    if record:
+        print(f">> Recording pages and geocoder answers to {record}.")
+        recorder.configure(RECORD, record)
+    if replay:
+        print(f">> Replaying pages and geocoder answers from {replay}.")
+        recorder.configure(REPLAY, replay)
+    if profile:
+        print(f">> Profiling ({profile_mode}) to {profile}.")
+        profiler.configure(profile, profile_mode)
+        profiler.set_search(None)
     if testtelegram:
         print(">> Just testing Telegram messaging.")
         test_telegram = True
     if not test_telegram:
         with get_session() as db:
             get_all_post(db=db, exclusive_id=exclusive_id, write_database=write_database,
-                         send_message=send_message, num_pages=num_pages, verbose=verbose_mode)
+                         send_message=send_message, num_pages=num_pages, verbose=verbose_mode,
+                         send_outbox=send_outbox, processes=processes)
+            # notifications are sent in the background while searching
+            outbox_sender.close(db)
+        print_delivery_failures()
+        metrics.write()
+        profiler.finish()
     else:
         chat_id = configs.CHAT_ID
         send_test_message(chat_id, False)
@@ -85,280 +131,337 @@ def start(silent, testtelegram, nonperm, exclusive, depth, verbose):
     print("<< ebayAlert finished @", end.strftime("%H:%M:%S"), "Duration:", end - starttime)
 
 
-def get_all_post(db: Session, exclusive_id, write_database, send_message, num_pages, verbose):
-    searches = crud_search.get_all(db=db)
-    if searches:
-        for link_model in searches:
-            if (exclusive_id is not False and exclusive_id == link_model.id) or exclusive_id is False:
-                # get URL by search_type
-                db_search_type = crud_search_type.get_by_key({"search_type": link_model.search_type}, db)
-                link_model.url = db_search_type.search_url
-                search_type = link_model.search_type.split("_")
-                if link_model.status != 0 and search_type[0] == "KLEIN":
-                    """
-                    every search has a status
-                    0 = search disabled
-                    1 = search active. update db and send messages
-                    2 = search silent = update db but do not send messages
-                    """
-                    # scrape search pages and add new/changed items to db
-                    locationfilterhint = ""
-                    while True:
-                        if type(link_model.zipcodes) != NoneType:
-                            # DB setting takes priority
-                            locationfilterhint = " (Area from: DB)"
-                            break
-                        if configs.LOCATION_FILTER != "":
-                            locationfilterhint = " (Area from: configs.py)"
-                            break
-                        break
-                    mode = ""
-                    if type(link_model.price_target) != NoneType:
-                        mode = f'\'TARGET 0\' = {link_model.price_target}€'
-                    else:
-                        mode = f'RANGE {link_model.price_low}€ - {link_model.price_high}€'
-                    print(f'>> Searching ID:{link_model.id}: type \'{link_model.search_type}\', filter \'{link_model.search_string}\', mode: {mode}' + locationfilterhint)
-                    klein_factory = KleinItemFactory(link_model, num_pages)
-                    message_items = crud_klein.add_items_to_db(db=db, items=klein_factory.item_list, link_id=link_model.id, write_database=write_database)
-
-                    if link_model.status == 1: # run matching only search is active (!silent)
-
-                        # EBAY search enrichment
-                        # check if there are unmatched ebay items for same search type and match them
-                        db_results = crud_ebay.get_all_matching({"link_id": None, "search_type": search_type[1]}, db)
-                        if db_results:
-                            enrich_count = 0
-                            for item in db_results:
-                                # check if ebay item fits the search terms considering the exclusions
-                                item_matching = True
-                                item_title = item.title.lower()
-                                search_terms = link_model.search_string.split(" ")
-
-                                if not match_title(item_title, search_terms):
-                                    item_matching = False
-
-                                if item_matching:
-                                    enrich_count += 1
-                                    # update link_id for ebay item if matched
-                                    if write_database:
-                                        crud_ebay.update({"identifier": "post_id", "post_id": int(item.post_id), "link_id": int(link_model.id)}, db=db)
-                                    # add to message items
-                                    item.location = "Ebay"
-                                    item.link = settings.EBAY_BASE_ITEM + str(item.post_id)
-                                    message_items.append(item)
-                            if enrich_count > 0:
-                                print(' Matched from Ebay:' + str(enrich_count), end='')
-
-                        # check for items worth sending and send
-                        if len(message_items) > 0:
-                            filter_message_items(link_model, message_items, send_message=send_message, verbose=verbose)
-                        else:
-                            print(' Nothing to report.')
-                    else:
-                        # end output
-                        print(' (Silent search)')
-                elif link_model.status == 1 and search_type[0] == "EBAY":
-                    """
-                    EBAY search enrichment
-                    - all items that are not in the db (by ebay ID) are added
-                    - matching to "regular" searches is done while processing the specified search on next script execution
-                    """
-                    print(f'>> Searching ID:{link_model.id}: type \'{link_model.search_type}\'')
-                    ebay_factory = EbayItemFactory(link_model)
-                    crud_ebay.add_items_to_db(db=db, items=ebay_factory.item_list, search_type=search_type[1], write_database=write_database)
+@cli.command(options_metavar="<options>", help="Send pending notifications from the outbox.")
+def send():
+    starttime = datetime.now()
+    print(">> Sending outbox @", starttime.strftime("%H:%M:%S"))
+    with get_session() as db:
+        outbox_sender.drain(db)
+        outbox_sender.close(db)
+    print_delivery_failures()
+    end = datetime.now()
+    print(f"<< {telegram_queue.sent} notifications sent @", end.strftime("%H:%M:%S"), "Duration:", end - starttime)
 
 
-def calc_benefit(target) -> int:
-    return round(target - target * configs.TARGET_MODE_BENEFIT)
+@cli.command(options_metavar="<options>", help="Keep running and check every search on its own interval.")
+@click.option("-s", "--silent", is_flag=True, help="Do not send notifications.")
+@click.option("-v", "--verbose", is_flag=True, help="Show more near matches.")
+@click.option("-d", "--depth", 'depth', metavar="<pages n>", help="When available (on Kleinanzeigen), scan n pages of pagination (default 1).")
+@click.option("-w", "--workers", 'workers', metavar="<processes n>", help="Fetch and parse in n processes (default 1 = threads only, at most FETCH_HOST_CONCURRENCY).")
+def daemon(silent, verbose, depth, workers):
+    """
+    searches are checked when they are due (see SearchScheduler), the search plan is cached until the searches change
+    HTTP connections, browser headers and geocoder cache stay loaded between the checks
+    """
+    send_message = not silent
+    num_pages = int(depth) if depth else 1
+    processes = limit_processes(int(workers)) if workers else 1
+    scheduler = SearchScheduler(configs.DAEMON_INTERVAL * 60, configs.DAEMON_MIN_INTERVAL * 60,
+                                configs.DAEMON_MAX_INTERVAL * 60)
+    # changes to the searches are picked up at least this often
+    poll = configs.DAEMON_MIN_INTERVAL * 60
+    print("----------------------------------------------------------------------------------")
+    print(">> Starting ebayAlert daemon @", datetime.now().strftime("%H:%M:%S"))
+    if silent:
+        print(">> No notifications.")
+    try:
+        while True:
+            with get_session() as db:
+                # read again only after the searches were edited
+                active_searches = crud_search.get_cached_plan(db)
+                scheduler.sync(active_searches, monotonic())
+                due_ids = set(scheduler.pop_due(monotonic()))
+                due_searches = [link_model for link_model in active_searches if link_model.id in due_ids]
+                if due_searches:
+                    starttime = datetime.now()
+                    print("----------------------------------------------------------------------------------")
+                    print(f">> Checking {len(due_searches)} of {len(active_searches)} searches @", starttime.strftime("%H:%M:%S"))
+                    new_posts = {}
+                    try:
+                        new_posts = run_searches(db, due_searches, write_database=True, send_message=send_message,
+                                                 num_pages=num_pages, verbose=verbose, processes=processes)
+                    finally:
+                        # a failed search is tried again after its current interval
+                        intervals = []
+                        for link_model in due_searches:
+                            interval = scheduler.reschedule(link_model.id, new_posts.get(link_model.id), monotonic())
+                            intervals.append(f"ID:{link_model.id} {round(interval / 60)}min")
+                        print("<< Next checks:", ", ".join(intervals), "Duration:", datetime.now() - starttime)
+                        # notifications of this round may still be in the queue
+                        metrics.write()
+                outbox_sender.flush(db)
+            db.close()
+            next_due = scheduler.next_due()
+            sleep(poll if next_due is None else min(poll, max(1, next_due - monotonic())))
+    except KeyboardInterrupt:
+        print(">> Stopping ebayAlert daemon, sending remaining notifications.")
+    with get_session() as db:
+        outbox_sender.close(db)
+    print_delivery_failures()
+
+
+def print_delivery_failures():
+    if telegram_queue.failed > 0:
+        print(f"<< {telegram_queue.failed} of {telegram_queue.sent + telegram_queue.failed} notifications could not be sent.")
+
+
+def get_all_post(db: Session, exclusive_id, write_database, send_message, num_pages, verbose, send_outbox=True,
+                 processes=1):
+    active_searches = crud_search.get_plan(db, exclusive_id)
+    if active_searches:
+        run_searches(db, active_searches, write_database=write_database, send_message=send_message,
+                     num_pages=num_pages, verbose=verbose, send_outbox=send_outbox, processes=processes)
+
+
+def run_searches(db: Session, active_searches: List, write_database, send_message, num_pages, verbose,
+                 send_outbox=True, processes=1) -> Dict[int, int]:
+    """
+    fetch and process the given searches (SearchPlan, in the order of crud_search.get_plan)
+    processes: fetching and parsing is spread over n processes, DB writes and matching stay in this one
+    returns the number of new or changed posts per search ID, failed searches are missing
+    """
+    new_posts = {}
+    outbox_sender.new_run()
+
+    # fetch all search pages in parallel, the results are processed one search after the other
+    print(f">> Fetching {len(active_searches)} searches.")
+    known_ids = {}
+    if num_pages > 1:
+        # pagination stops at pages with mostly known posts
+        known_ids = crud_klein.get_post_ids_by_search([link_model.id for link_model in active_searches
+                                                       if link_model.search_type.startswith("KLEIN")], db)
+    factories = fetch_all(active_searches, num_pages, known_ids, processes)
+
+    # known posts are skipped without a DB lookup, kept between runs in daemon mode
+    seen_posts.load(db)
+    # posts of a failed run are not stored
+    seen_posts.rollback()
+
+    if write_database and configs.EBAY_RETENTION_DAYS:
+        # ebay items no search matched in time are not kept forever
+        expired = crud_ebay.delete_unmatched_before(datetime.utcnow() - timedelta(days=int(configs.EBAY_RETENTION_DAYS)), db)
+        metrics.count("ebay_expired", expired)
+        if expired:
+            print(f">> Removed {expired} unmatched Ebay items older than {configs.EBAY_RETENTION_DAYS} days.")
+
+    # only ebay items inserted after the mark of a search are matched against it
+    ebay_marks = crud_ebay_mark.get_marks(active_searches, db)
+    # search type -> (index of the unmatched items above the lowest mark of its searches, last ebay_post.id)
+    ebay_indexes = {}
+
+    for link_model in active_searches:
+        # timings and counters of this thread are attributed to the search
+        metrics.set_search(link_model.id)
+        profiler.set_search(link_model.id)
+        search_type = link_model.search_type.split("_")
+        try:
+            if search_type[0] == "KLEIN":
+                """
+                every search has a status
+                0 = search disabled
+                1 = search active. update db and send messages
+                2 = search silent = update db but do not send messages
+                """
+                # add new/changed items of scraped search pages to db
+                locationfilterhint = ""
+                while True:
+                    if type(link_model.zipcodes) != NoneType:
+                        # DB setting takes priority
+                        locationfilterhint = " (Area from: DB)"
+                        break
+                    if configs.LOCATION_FILTER != "":
+                        locationfilterhint = " (Area from: configs.py)"
+                        break
+                    break
+                mode = ""
+                if type(link_model.price_target) != NoneType:
+                    mode = f'\'TARGET 0\' = {link_model.price_target}€'
+                else:
+                    mode = f'RANGE {link_model.price_low}€ - {link_model.price_high}€'
+                print(f'>> Searching ID:{link_model.id}: type \'{link_model.search_type}\', filter \'{link_model.search_string}\', mode: {mode}' + locationfilterhint)
+                klein_factory = factories.get(link_model.id)
+                if klein_factory is None:
+                    print(' Fetching failed.')
+                    continue
+                # posts and their notifications (outbox) are committed together after matching
+                with metrics.timer(DEDUP):
+                    message_items = crud_klein.add_items_to_db(db=db, items=klein_factory.item_list, link_id=link_model.id,
+                                                               write_database=write_database, commit=False, seen=seen_posts)
+                new_posts[link_model.id] = len(message_items)
+                metrics.count("items_scraped", len(klein_factory.item_list))
+                metrics.count("items_new", len(message_items))
+
+                if link_model.status == 1: # run matching only search is active (!silent)
+
+                    # EBAY search enrichment
+                    # check if there are unmatched ebay items for same search type and match them
+                    # unmatched items are loaded and indexed once per search type and run
+                    with metrics.timer(ENRICHMENT):
+                        if search_type[1] not in ebay_indexes:
+                            after_id = min(ebay_marks[search.id] for search in active_searches
+                                           if search.search_type == link_model.search_type and search.status == 1)
+                            ebay_indexes[search_type[1]] = (TitleIndex(crud_ebay.get_unmatched(search_type[1], after_id, db)),
+                                                            crud_ebay.get_last_id(search_type[1], db))
+                        ebay_index, last_ebay_id = ebay_indexes[search_type[1]]
+                        # new ebay items fitting the search terms considering the exclusions
+                        mark = ebay_marks[link_model.id]
+                        matched_items = [item for item in ebay_index.match(get_query(link_model.search_string)) if item.id > mark]
+                        if write_database:
+                            # update link_id for matched ebay items, all in one statement
+                            crud_ebay.update_many([{"post_id": int(item.post_id), "link_id": int(link_model.id)} for item in matched_items],
+                                                  identifier="post_id", db=db, commit=False)
+                            crud_ebay_mark.set_mark(link_model, last_ebay_id, db)
+                        for item in matched_items:
+                            if write_database:
+                                # a linked item is not unmatched anymore for the following searches
+                                ebay_index.remove(item)
+                            # add to message items
+                            item.location = "Ebay"
+                            item.link = settings.EBAY_BASE_ITEM + str(item.post_id)
+                            message_items.append(item)
+                    metrics.count("ebay_matched", len(matched_items))
+                    if len(matched_items) > 0:
+                        print(' Matched from Ebay:' + str(len(matched_items)), end='')
+
+                    # check for items worth sending and send
+                    if len(message_items) > 0:
+                        with metrics.timer(FILTER):
+                            filter_message_items(link_model, message_items, db=db, send_message=send_message, verbose=verbose,
+                                                 write_database=write_database)
+                    else:
+                        print(' Nothing to report.')
+                else:
+                    # end output
+                    print(' (Silent search)')
+                db.commit()
+                seen_posts.commit()
+                if send_message and write_database and send_outbox:
+                    outbox_sender.drain(db)
+            elif search_type[0] == "EBAY":
+                """
+                EBAY search enrichment
+                - all items that are not in the db (by ebay ID) are added
+                - matching to "regular" searches is done while processing the specified search on next script execution
+                """
+                print(f'>> Searching ID:{link_model.id}: type \'{link_model.search_type}\'')
+                ebay_factory = factories.get(link_model.id)
+                if ebay_factory is None:
+                    print(' Fetching failed.')
+                    continue
+                with metrics.timer(DEDUP):
+                    new_items = crud_ebay.add_items_to_db(db=db, items=ebay_factory.item_list, search_type=search_type[1], write_database=write_database)
+                new_posts[link_model.id] = len(new_items)
+                metrics.count("items_scraped", len(ebay_factory.item_list))
+                metrics.count("items_new", len(new_items))
+                # new unmatched items, index has to be rebuilt
+                ebay_indexes.pop(search_type[1], None)
+        except Exception as e:
+            # a failing search is rolled back on its own, the following searches still run
+            db.rollback()
+            new_posts.pop(link_model.id, None)
+            seen_posts.rollback()
+            # the index may have dropped items whose links were rolled back
+            ebay_indexes.pop(search_type[1], None)
+            log.error(e)
+            print(f" Search ID:{link_model.id} failed: {e}")
+    metrics.set_search(None)
+    profiler.set_search(None)
+    return new_posts
 
 
 def benefit_printable() -> str:
     return f"{configs.TARGET_MODE_BENEFIT * 100}%"
 
 
-def match_title(item_title, search_terms):
-    title_matching = True
-
-    for term in search_terms:
-        if not term.startswith("-"):
-            # positive search terms
-            if not match_title_cases(item_title, term):
-                title_matching = False
-        elif term.startswith("-"):
-            # negative search terms
-            term = term[1:]
-            if match_title_cases(item_title, term):
-                title_matching = False
-
-    return title_matching
-
-
-def match_title_cases(item_title, term):
-    if term.isdigit():
-        return item_title.find(term) > -1
-    if re.search(r"\b" + re.escape(term) + r"\b", item_title):
-        return True
-    if re.search(r"\d" + re.escape(term) + r"\b", item_title):
-        return True
-    return False
+def filter_message_items(link_model, message_items, db: Session, send_message, verbose, write_database=True):
+    firstmessagesent = False
+    outbox_messages = []
+    # should you calculate and check distances ?
+    do_geoloc = False
+    geoloc_areas = ""
+    while True:
+        if type(link_model.zipcodes) != NoneType:
+            # DB setting takes priority: allows per search setting
+            do_geoloc = True
+            geoloc_areas = link_model.zipcodes
+            break
+        if configs.LOCATION_FILTER != "":
+            # Setting in config file is general filtering
+            do_geoloc = True
+            geoloc_areas = configs.LOCATION_FILTER
+            break
+        break
+    force_prio_geoloc = True if configs.FORCE_PRIO_GEOLOC == "1" else False
+    search_query = get_query(link_model.search_string)
 
+    thresholds = get_thresholds(link_model.price_target, link_model.price_info, link_model.price_low,
+                                link_model.price_high, configs.TARGET_MODE_BENEFIT)
 
-def filter_message_items(link_model, message_items, send_message, verbose):
-    firstmessagesent = False
+    evaluations = []
     for item in message_items:
         evaluationlog = ""
         # default is true
         worth_messaging = True
-        # current price as integer
-        item_price = item.price
-        item_price_num = re.findall(r'\d+', re.sub("\.", "", item_price))
-        if len(item_price_num) == 0:
-            item_price_num = 0
-        else:
-            item_price_num = int(item_price_num[0])
+        # current price in whole euros
+        price_cents, negotiable = item.price_cents, item.negotiable
+        if price_cents is None:
+            price_cents, negotiable = parse_price(item.price)
+        item_price_num = price_cents // 100
 
         # pricerange visual indicator
         pricerange = ""
 
-        # check if search string exclusions exclude this result
-        if link_model.search_string != "":
-            search_term_parts = link_model.search_string.split(" ")
-            search_term_parts[:] = [x[1:] for x in search_term_parts if x.startswith("-")]
-            # generally exclude "defekt" items
-            search_term_parts.append("defekt")
-            for x in search_term_parts:
-                if worth_messaging and item.title.lower().find(x) > -1:
-                    worth_messaging = False
-                    evaluationlog += 'f'
+        # check if search string exclusions (and "defekt") exclude this result
+        if search_query.excludes(item.title.lower()):
+            worth_messaging = False
+            evaluationlog += 'f'
 
         # check if message worth sending by price in two different modes
         # METHOD 1
-        if worth_messaging and type(link_model.price_target) != NoneType:
+        if worth_messaging and thresholds.target is not None:
             # Mode: TARGET (= reach break even price, 0€ loss/benefit)
-            price_low = int(link_model.price_target) * 0.7
-            price_target = int(link_model.price_target)
-            price_benefit = calc_benefit(price_target)
-
-            # price range not hit by default
-            worth_messaging = False
-            item.pricehint = ""
-
-            if item_price_num <= 1 and verbose:
-                # price is 0 or 1
-                item.pricehint = "[Offer]"
-                worth_messaging = True
-                evaluationlog += 'o'
-            elif price_low <= item_price_num <= price_benefit:
-                item.pricehint = f'[DEAL]'
-                worth_messaging = True
-                evaluationlog += 'X'
-            elif price_benefit < item_price_num <= price_target and "VB" in item_price and verbose:
-                item.pricehint = "[MAYBE]"
-                worth_messaging = True
-                evaluationlog += 'm'
+            worth_messaging, log_entry, item.pricehint = thresholds.evaluate_target(item_price_num, negotiable, verbose)
+            evaluationlog += log_entry
             item.pricehint += f"\n[{link_model.search_string}]"
-
-            if type(link_model.price_info) != NoneType:
-                infos = link_model.price_info.split('-')
-                for info in infos:
-                    pair = info.split(':')
-                    target = int(pair[1])
-                    benefit_goal = calc_benefit(target)
-                    pricerange += f"T0 {pair[0]}: {target}€ ({target - item_price_num}€) WIN({benefit_printable()}): {benefit_goal}€ -> {benefit_goal - item_price_num}€ ({round(((target - item_price_num)*100)/target)}%)\n"
-            else:
-                pricerange = f"T0: {price_target}€ ({price_target - item_price_num}€)\nWIN({benefit_printable()}): {price_benefit}€ -> {price_benefit - item_price_num}€ ({round(((price_target - item_price_num)*100)/price_target)}%)\n"
+            pricerange = thresholds.target_range(item_price_num, benefit_printable())
             item.pricerange = pricerange
             if type(item) == EbayPost:
                 item.print_price = f'{item.price}\n[{link_model.search_string}]\n{item.pricerange}'
 
         # METHOD 2
-        if worth_messaging and type(link_model.price_high) != NoneType:
+        if worth_messaging and thresholds.price_high is not None:
             # Mode: PRICERANGE
-            # maximal item price to be shown (20% range)
-            price_max = round(int(link_model.price_high) * 1.2)
-            if (price_max - link_model.price_high) > 20:
-                price_max = link_model.price_high + 20
             # INFO: lowest price to show in verbose is 30% below minimal price
-
-            if int(link_model.price_low) <= item_price_num <= int(link_model.price_high):
-                pricediff = int(link_model.price_high) - int(link_model.price_low)
-                pricepos = round((item_price_num - int(link_model.price_low)) * 10 / pricediff)
-                for x in range(0, 11):
-                    if x == pricepos:
-                        pricerange += "X"
-                    else:
-                        pricerange += "."
-            else:
-                pricerange = "......."
-
-            # price range not hit by default
-            worth_messaging = False
-
-            if item_price_num <= 1:
-                # price is 0 or 1
-                worth_messaging = True
-                evaluationlog += 'V'
-            elif int(link_model.price_low) <= item_price_num <= int(link_model.price_high):
-                # price within range
-                worth_messaging = True
-                evaluationlog += 'X'
-            elif int(link_model.price_high) < item_price_num <= price_max \
-                    and "VB" in item_price and verbose:
-                # price is negotiable and max 20% over watching price max 20€
-                item.pricehint = f"(+20%)"
-                worth_messaging = True
-                evaluationlog += 'h'
-            elif int(link_model.price_low) * 0.7 <= item_price_num < int(link_model.price_low) and verbose:
-                # price is 30% below watch price
-                item.pricehint = f"(-30%)"
-                worth_messaging = True
-                evaluationlog += 'l'
+            position = thresholds.range_position(item_price_num)
+            pricerange = pricerange + position if position is not None else "......."
+            worth_messaging, log_entry, pricehint = thresholds.evaluate_range(item_price_num, negotiable, verbose)
+            evaluationlog += log_entry
+            if pricehint is not None:
+                item.pricehint = pricehint
             pricerange = " [" + pricerange + "] "
             item.pricerange = f"{link_model.price_low}€{pricerange}{link_model.price_high}€"
+            if type(item) == EbayPost and thresholds.target is None:
+                item.print_price = f'{item.price}\n[{link_model.search_string}]\n{item.pricerange}'
 
-        # should you calculate and check distances ?
-        do_geoloc = False
-        geoloc_areas = ""
-        while True:
-            if type(link_model.zipcodes) != NoneType:
-                # DB setting takes priority: allows per search setting
-                do_geoloc = True
-                geoloc_areas = link_model.zipcodes.split('-')
-                break
-            if configs.LOCATION_FILTER != "":
-                # Setting in config file is general filtering
-                do_geoloc = True
-                geoloc_areas = configs.LOCATION_FILTER.split('-')
-                break
-            break
-
-        force_prio_geoloc = True if configs.FORCE_PRIO_GEOLOC == "1" else False
         item_noshipping = True if item.shipping == "No Shipping" else False
-
-        # calculate distance
+        check_distance = worth_messaging and ((do_geoloc and item_noshipping) or force_prio_geoloc)
+        evaluations.append((item, worth_messaging, evaluationlog, item_noshipping, check_distance))
+
+    # calculate distances of all items of this search at once
+    distance_items = [evaluation[0] for evaluation in evaluations if evaluation[4]]
+    distance_results = iter([])
+    if distance_items:
+        with metrics.timer(GEOCODING):
+            # filter areas are resolved once per search, geocoding results are cached
+            area_filter = AreaFilter(geocoder.get_areas(geoloc_areas, db, write_database), configs.GEO_DISTANCE_METHOD)
+            distance_results = iter(area_filter.in_range([geocoder.locate_item(item.location, db, write_database)
+                                                          for item in distance_items]))
+
+    for item, worth_messaging, evaluationlog, item_noshipping, check_distance in evaluations:
         item_inrange = False
-        if worth_messaging and ((do_geoloc and item_noshipping) or force_prio_geoloc):
+        if check_distance:
             evaluationlog += '?'
-            # ZIPCODES in DB like this: dist1,zip11,zip12,..,zip1N-dist2,zip21..
-            geocoder = Nominatim(user_agent="cyberpete2244/kleinanzeigenAlert")
-            geoloc_item = geocoder.geocode(re.findall(r'\d+', item.location))
-            # cycle through areas and through zipcodes
-            t = 0
-            while t < len(geoloc_areas) and not item_inrange:
-                distancegroup = geoloc_areas[t].split(',')
-                max_distance = int(distancegroup[0])
-                n = 1
-                while n < len(distancegroup) and not item_inrange:
-                    geoloc_filter = geocoder.geocode(distancegroup[n])
-                    itemdistance = round(distance.distance((geoloc_item.latitude, geoloc_item.longitude),
-                                                           (geoloc_filter.latitude, geoloc_filter.longitude)).km)
-                    if itemdistance <= max_distance:
-                        item_inrange = True
-                        n = len(distancegroup)
-                        t = len(geoloc_areas)
-                    else:
-                        n += 1
-                t += 1
+            item_inrange = next(distance_results)
             if item_inrange:
                 evaluationlog += '+'
             elif not item_inrange:
@@ -393,8 +496,16 @@ def filter_message_items(link_model, message_items, send_message, verbose):
                         break
                     break
 
-            send_formatted_message(item, chat_id, priority_send)
+            if write_database:
+                # delivered from the outbox once committed
+                post_id = f"ebay:{item.post_id}" if type(item) is EbayPost else f"klein:{item.id}"
+                outbox_messages.append({"dedup_key": f"{post_id}:{item.price}:{chat_id}", "chat_id": str(chat_id),
+                                        "priority": int(priority_send), "message": format_message(item)})
+            else:
+                send_formatted_message(item, chat_id, priority_send)
 
+    if outbox_messages:
+        crud_outbox.add_messages(outbox_messages, db)
     if not firstmessagesent:
         print(' Nothing worth messaging.', end='')
     print('')
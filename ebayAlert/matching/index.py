@@ -0,0 +1,81 @@
+import re
+from collections import defaultdict
+from typing import Iterable, List, Optional, Set
+
+from ebayAlert import create_logger
+from ebayAlert.matching.query import SearchQuery
+
+log = create_logger(__name__)
+
+WORD = re.compile(r"\w+")
+
+
+class TitleIndex:
+    """
+    inverted index (token -> item ids) over the lowercase titles of items with an "id"
+    candidates of a query are found by intersecting the postings of its positive terms,
+    every candidate is verified with the full query (negative terms, digit rules)
+    """
+    def __init__(self, items: Iterable):
+        self.items = {}
+        self.postings = defaultdict(set)
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, item) -> None:
+        title = item.title.lower()
+        self.items[item.id] = (item, title)
+        for token in _index_tokens(title):
+            self.postings[token].add(item.id)
+
+    def remove(self, item) -> None:
+        _, title = self.items.pop(item.id)
+        for token in _index_tokens(title):
+            self.postings[token].discard(item.id)
+
+    def match(self, query: SearchQuery) -> List:
+        candidates = None
+        for term in query.positive_terms:
+            term_candidates = self._term_candidates(term)
+            if term_candidates is None:
+                # term can not be looked up, no narrowing
+                continue
+            candidates = term_candidates if candidates is None else candidates & term_candidates
+            if not candidates:
+                return []
+        if candidates is None:
+            candidates = self.items.keys()
+        matches = []
+        for item_id in sorted(candidates):
+            item, title = self.items[item_id]
+            if query.matches(title):
+                matches.append(item)
+        return matches
+
+    def _term_candidates(self, term: str) -> Optional[Set]:
+        if term.isdigit():
+            # numbers match as substring of any token
+            candidates = set()
+            for token, item_ids in self.postings.items():
+                if term in token:
+                    candidates |= item_ids
+            return candidates
+        # the first word of a matching term is a whole token or follows a digit inside a token
+        word = WORD.search(term)
+        if word is None:
+            return None
+        return set(self.postings.get(word.group(), ()))
+
+
+def _index_tokens(title: str) -> Set[str]:
+    tokens = set()
+    for token in WORD.findall(title):
+        tokens.add(token)
+        # "128gb" is found by "gb" and "28gb"
+        for n in range(1, len(token)):
+            if token[n - 1].isdigit():
+                tokens.add(token[n:])
+    return tokens
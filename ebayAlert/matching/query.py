@@ -0,0 +1,50 @@
+import re
+from functools import lru_cache
+from ebayAlert import create_logger
+
+log = create_logger(__name__)
+
+
+class SearchQuery:
+    """
+    compiled search string of a search, e.g. "iphone 12 -defekt -case"
+    matches(): all positive terms and none of the negative terms match the title (word or digit prefixed, numbers as substring)
+    excludes(): title contains a negative term or "defekt" anywhere (used for messaging)
+    """
+    def __init__(self, search_string: str):
+        self.search_string = search_string
+        terms = search_string.split(" ")
+        self.positive_terms = [term for term in terms if not term.startswith("-")]
+        self.negative_terms = [term[1:] for term in terms if term.startswith("-")]
+        # one pattern for all terms: a lookahead per term, anchored at the start of the title
+        pattern = "".join(f"(?=[\\s\\S]*?{_term_pattern(term)})" for term in self.positive_terms)
+        pattern += "".join(f"(?![\\s\\S]*?{_term_pattern(term)})" for term in self.negative_terms)
+        self.pattern = re.compile(r"\A" + pattern)
+        self.exclusion_pattern = None
+        if search_string != "":
+            # generally exclude "defekt" items
+            exclusions = self.negative_terms + ["defekt"]
+            self.exclusion_pattern = re.compile("|".join(re.escape(term) for term in exclusions))
+
+    def matches(self, item_title: str) -> bool:
+        return self.pattern.match(item_title) is not None
+
+    def excludes(self, item_title: str) -> bool:
+        return self.exclusion_pattern is not None and self.exclusion_pattern.search(item_title) is not None
+
+    def __repr__(self):
+        return f"SearchQuery({self.search_string!r})"
+
+
+def _term_pattern(term: str) -> str:
+    if term.isdigit():
+        # numbers match anywhere, e.g. "12" in "iphone12pro"
+        return re.escape(term)
+    # term as word or directly following a digit, e.g. "gb" in "128gb"
+    return r"(?:\b" + re.escape(term) + r"\b|\d" + re.escape(term) + r"\b)"
+
+
+@lru_cache(maxsize=1024)
+def get_query(search_string: str) -> SearchQuery:
+    return SearchQuery(search_string)
+
@@ -0,0 +1,101 @@
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+
+def calc_benefit(target, benefit: float) -> int:
+    return round(target - target * benefit)
+
+
+class PriceThresholds(NamedTuple):
+    """
+    price limits of a search, computed once (get_thresholds) and used for every item
+    prices are whole euros, like the limits in the DB
+    TARGET mode: price_target (and optional price_info "name:target-name:target")
+    RANGE mode: price_low and price_high
+    """
+    benefit: float
+    target: Optional[int]
+    target_low: float
+    target_benefit: int
+    # (name, target, benefit goal) per entry of price_info
+    target_infos: Optional[Tuple[Tuple[str, int, int], ...]]
+    price_low: Optional[int]
+    price_high: Optional[int]
+    price_max: int
+
+    def evaluate_target(self, price: int, negotiable: bool, verbose: bool) -> Tuple[bool, str, str]:
+        """
+        returns worth messaging, evaluation log and price hint
+        """
+        if price <= 1 and verbose:
+            # price is 0 or 1
+            return True, "o", "[Offer]"
+        if self.target_low <= price <= self.target_benefit:
+            return True, "X", "[DEAL]"
+        if self.target_benefit < price <= self.target and negotiable and verbose:
+            return True, "m", "[MAYBE]"
+        return False, "", ""
+
+    def target_range(self, price: int, benefit_printable: str) -> str:
+        if self.target_infos is not None:
+            pricerange = ""
+            for name, target, benefit_goal in self.target_infos:
+                pricerange += f"T0 {name}: {target}€ ({target - price}€) WIN({benefit_printable}): {benefit_goal}€ -> {benefit_goal - price}€ ({round(((target - price)*100)/target)}%)\n"
+            return pricerange
+        return f"T0: {self.target}€ ({self.target - price}€)\nWIN({benefit_printable}): {self.target_benefit}€ -> {self.target_benefit - price}€ ({round(((self.target - price)*100)/self.target)}%)\n"
+
+    def evaluate_range(self, price: int, negotiable: bool, verbose: bool) -> Tuple[bool, str, Optional[str]]:
+        """
+        returns worth messaging, evaluation log and price hint (None = unchanged)
+        """
+        if price <= 1:
+            # price is 0 or 1
+            return True, "V", None
+        if self.price_low <= price <= self.price_high:
+            # price within range
+            return True, "X", None
+        if self.price_high < price <= self.price_max and negotiable and verbose:
+            # price is negotiable and max 20% over watching price max 20€
+            return True, "h", "(+20%)"
+        if self.price_low * 0.7 <= price < self.price_low and verbose:
+            # price is 30% below watch price
+            return True, "l", "(-30%)"
+        return False, "", None
+
+    def range_position(self, price: int) -> Optional[str]:
+        """
+        position of the price within the range as "..X........", None if outside
+        """
+        if not self.price_low <= price <= self.price_high:
+            return None
+        pricediff = (self.price_high - self.price_low) or 1
+        pricepos = round((price - self.price_low) * 10 / pricediff)
+        return "".join("X" if x == pricepos else "." for x in range(0, 11))
+
+
+@lru_cache(maxsize=None)
+def get_thresholds(price_target, price_info, price_low, price_high, benefit: float) -> PriceThresholds:
+    target = int(price_target) if price_target is not None else None
+    target_infos = None
+    if target is not None and price_info is not None:
+        target_infos = []
+        for info in price_info.split('-'):
+            pair = info.split(':')
+            target_infos.append((pair[0], int(pair[1]), calc_benefit(int(pair[1]), benefit)))
+        target_infos = tuple(target_infos)
+    price_max = 0
+    if price_high is not None:
+        # maximal item price to be shown (20% range, max 20€)
+        price_max = round(int(price_high) * 1.2)
+        if (price_max - price_high) > 20:
+            price_max = price_high + 20
+    return PriceThresholds(
+        benefit=benefit,
+        target=target,
+        target_low=target * 0.7 if target is not None else 0,
+        target_benefit=calc_benefit(target, benefit) if target is not None else 0,
+        target_infos=target_infos,
+        price_low=int(price_low) if price_low is not None else None,
+        price_high=int(price_high) if price_high is not None else None,
+        price_max=price_max,
+    )
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Float, Index, Boolean
 from sqlalchemy.sql import func
 
 from ebayAlert import create_logger
 from ebayAlert.db.db import Base, engine
+from ebayAlert.db.migrations import migrate, backfill_prices
 
 log = create_logger(__name__)
 
@@ -12,25 +13,57 @@ class KleinPost(Base):
 
     id = Column(Integer, primary_key=True)
     title = Column(String)
-    price = Column(String)
-    post_id = Column(Integer)
-    link_id = Column(Integer)
+    price = Column(String)  # as shown on the website
+    price_cents = Column(Integer)
+    negotiable = Column(Boolean)  # "VB"
+    post_id = Column(Integer, index=True, unique=True)
+    link_id = Column(Integer, index=True)
     date = Column(DateTime(timezone=True), server_default=func.now())
 
 
 class EbayPost(Base):
     __tablename__ = "ebay_post"
+    __table_args__ = (
+        # unmatched items of a search type are looked up on every KLEIN search
+        Index("ix_ebay_post_search_type_link_id", "search_type", "link_id"),
+        # IDs of deleted items are never reused, the enrichment marks (ebay_mark) rely on growing IDs
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True)
     search_type = Column(String)
     title = Column(String)
-    price = Column(String)
+    price = Column(String)  # as shown on the website
+    price_cents = Column(Integer)
+    negotiable = Column(Boolean)  # "VB"
     shipping = Column(String)
-    post_id = Column(Integer)
+    post_id = Column(Integer, index=True, unique=True)
     link_id = Column(Integer)
     date = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class EbayMark(Base):
+    __tablename__ = "ebay_mark"
+
+    id = Column(Integer, primary_key=True)
+    search_id = Column(Integer, index=True, unique=True)
+    search_hash = Column(String)  # search type and string the mark belongs to, a change rematches all ebay items
+    last_ebay_id = Column(Integer)  # ebay_post.id up to which unmatched items were matched against the search
+
+
+class Outbox(Base):
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True)
+    dedup_key = Column(String, index=True, unique=True)  # one notification per post, price and chat
+    chat_id = Column(String)
+    priority = Column(Integer)  # 1 = send with priority bot
+    message = Column(String)
+    attempts = Column(Integer, default=0)  # failed deliveries
+    sent = Column(DateTime(timezone=True), index=True)  # NULL = pending
+    date = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class Search(Base):
     __tablename__ = "search"
 
@@ -44,6 +77,15 @@ class Search(Base):
     price_info = Column(String)
     zipcodes = Column(String)
     chat_id = Column(Integer)
+    interval = Column(Integer)  # minutes between checks in daemon mode, NULL = adaptive
+
+
+class TableVersion(Base):
+    __tablename__ = "table_version"
+
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String, index=True, unique=True)
+    version = Column(Integer)  # incremented by triggers on every change of the table
 
 
 class SearchType(Base):
@@ -54,4 +96,18 @@ class SearchType(Base):
     search_url = Column(String)
 
 
+class GeoLocation(Base):
+    __tablename__ = "geo_location"
+
+    id = Column(Integer, primary_key=True)
+    zipcode = Column(String, index=True, unique=True)
+    latitude = Column(Float)  # NULL if the zipcode could not be found
+    longitude = Column(Float)
+    date = Column(DateTime(timezone=True), server_default=func.now())
+
+
 Base.metadata.create_all(engine)
+migrate(engine, Base.metadata, backfills={
+    "klein_post.price_cents": backfill_prices,
+    "ebay_post.price_cents": backfill_prices,
+}, versioned=["search", "search_type"])
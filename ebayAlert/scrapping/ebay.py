@@ -1,65 +1,53 @@
 from typing import Generator
-from bs4 import BeautifulSoup
 
+from ebayAlert.core.metrics import metrics, PARSE
 from ebayAlert.core.settings import settings
 from ebayAlert.scrapping.item import BaseItem, ItemFactory
+from ebayAlert.scrapping.parser import HtmlParser
 from ebayAlert import create_logger
 
 log = create_logger(__name__)
 
 
 class EbayItem(BaseItem):
-    @property
-    def link(self) -> str:
-        url = self.contents.a.get('href')
-        return url[:url.index("?")]
+    __slots__ = ()
 
-    @property
-    def shipping(self) -> str:
-        return self._find_text_in_class("s-item__shipping s-item__logisticsCost") or "No Shipping"
-
-    @property
-    def title(self) -> str:
-        title = self._find_text_in_class("bsig__title__text")
+    @classmethod
+    def from_node(cls, node, parser: HtmlParser) -> "EbayItem":
+        url = parser.attr(parser.select_one(node, "a"), 'href')
+        title = cls._find_text_in_class(node, parser, "bsig__title__text") or ""
         prefix = "Neues Angebot"
         if title.startswith(prefix):
-            return title[len(prefix):]
-        return title or "No Title"
-
-    @property
-    def price(self) -> str:
+            title = title[len(prefix):]
         # strip EUR and add € at end
-        price = self._find_text_in_class("bsig__price") or 0
+        price = cls._find_text_in_class(node, parser, "bsig__price") or 0
         if price != 0:
             price = price[4:price.index(',')]
-        return f'{price} €'
-
-    @property
-    def description(self) -> str:
-        return "No Description"
-
-    @property
-    def id(self) -> int:
-        url = self.contents.a.get('href')
-        return int(url[url.rindex("/") + 1:url.index("?")]) or 0
-
-    @property
-    def location(self):
-        return "Ebay"
+        return cls(
+            id=int(url[url.rindex("/") + 1:url.index("?")]) or 0,
+            title=title or "No Title",
+            price=f'{price} €',
+            shipping=cls._find_text_in_class(node, parser, "s-item__shipping s-item__logisticsCost") or "No Shipping",
+            location="Ebay",
+            link=url[:url.index("?")]
+        )
 
 
 class EbayItemFactory(ItemFactory):
     def __init__(self, link_model):
         self.item_list = []
-        web_page_soup = self.get_webpage(settings.EBAY_URL_BASE + link_model.url)
-        if web_page_soup:
-            articles = self.extract_item_from_page(web_page_soup)
-            self.item_list += [EbayItem(article) for article in articles]
-
-    @staticmethod
-    def extract_item_from_page(soup: BeautifulSoup) -> Generator:
-        result = soup.find(attrs={"class": "brwrvr__item-results--list"})
+        # an unchanged category page has no new items
+        web_page = self.get_webpage(settings.EBAY_URL_BASE + link_model.url, [".brwrvr__item-results--list"],
+                                    revalidate=True)
+        if web_page:
+            with metrics.timer(PARSE):
+                articles = self.extract_item_from_page(web_page)
+                self.item_list += [EbayItem.from_node(article, self.parser) for article in articles]
+
+    @classmethod
+    def extract_item_from_page(cls, web_page) -> Generator:
+        result = cls.parser.select_one(web_page, ".brwrvr__item-results--list")
         if result:
-            for item in result.find_all(attrs={"class": "brwrvr__item-card__body"}):
+            for item in cls.parser.select(result, ".brwrvr__item-card__body"):
                 if item:
                     yield item
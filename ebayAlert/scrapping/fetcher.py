@@ -0,0 +1,134 @@
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import redirect_stdout
+from typing import Dict, List, Optional, Set, Tuple
+
+from ebayAlert import create_logger
+from ebayAlert.core.configs import configs
+from ebayAlert.core.metrics import metrics
+from ebayAlert.core.profiling import profiler, CPROFILE
+from ebayAlert.core.replay import recorder
+from ebayAlert.scrapping.ebay import EbayItemFactory
+from ebayAlert.scrapping.item import FetchError, ItemFactory, host_limiter
+from ebayAlert.scrapping.klein import KleinItemFactory
+
+log = create_logger(__name__)
+
+# kept for the lifetime of the process, the threads keep their HTTP sessions and connections warm
+_executor = None
+_process_executor = None
+
+
+def create_factory(link_model, num_pages, known_ids: Optional[Set[int]] = None) -> Optional[ItemFactory]:
+    search_type = link_model.search_type.split("_")
+    profiler.set_search(link_model.id)
+    try:
+        with metrics.search(link_model.id):
+            if search_type[0] == "KLEIN":
+                return KleinItemFactory(link_model, num_pages, known_ids)
+            if search_type[0] == "EBAY":
+                return EbayItemFactory(link_model)
+    finally:
+        profiler.stop()
+
+
+def fetch_all(searches: List, num_pages, known_ids: Optional[Dict[int, Set[int]]] = None,
+              processes: int = 1) -> Dict[int, ItemFactory]:
+    """
+    fetch and parse the pages of all searches in parallel
+    requests per host are limited in ItemFactory.get_webpage, the result is mapped by search ID
+    known_ids: post IDs stored per search (loaded beforehand, the workers do not use the DB session)
+    processes: > 1 parses in that many processes instead of threads, the DB is only used by the calling process
+    """
+    known_ids = known_ids or {}
+    factories = {}
+    if not searches:
+        return factories
+    if processes > 1:
+        return _fetch_in_processes(searches, num_pages, known_ids, processes)
+    executor = _get_executor()
+    futures = {executor.submit(create_factory, link_model, num_pages, known_ids.get(link_model.id)): link_model for link_model in searches}
+    for future, link_model in futures.items():
+        try:
+            factories[link_model.id] = future.result()
+        except FetchError as e:
+            # no factory, run_searches reports the search as failed
+            print(f"<< fetching failed for search ID:{link_model.id}: {e}")
+        except Exception as e:
+            log.error(e)
+            print(f"<< fetching failed for search ID:{link_model.id}: {e}")
+    return factories
+
+
+def limit_processes(processes: int) -> int:
+    """
+    every process gets at least one request slot and token per host (HostLimiter.share),
+    more processes than FETCH_HOST_CONCURRENCY and FETCH_HOST_BURST allow would exceed the limits per host
+    """
+    limit = min(host_limiter.concurrency, max(1, int(host_limiter.burst)))
+    if processes > limit:
+        print(f">> Fetching in {limit} instead of {processes} processes, more would exceed the request limits per host.")
+        return limit
+    return processes
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max(1, int(configs.FETCH_WORKERS)))
+    return _executor
+
+
+def _fetch_in_processes(searches: List, num_pages, known_ids: Dict[int, Set[int]], processes: int) -> Dict[int, ItemFactory]:
+    factories = {}
+    executor = _get_process_executor(processes)
+    futures = {}
+    for link_model in searches:
+        # link_model is a picklable SearchPlan
+        futures[executor.submit(_fetch_search, link_model, num_pages, known_ids.get(link_model.id))] = link_model
+    for future, link_model in futures.items():
+        try:
+            factories[link_model.id], output, search_metrics, search_stats = future.result()
+        except FetchError as e:
+            print(f"<< fetching failed for search ID:{link_model.id}: {e}")
+            continue
+        except Exception as e:
+            log.error(e)
+            print(f"<< fetching failed for search ID:{link_model.id}: {e}")
+            continue
+        metrics.merge(search_metrics)
+        profiler.merge_stats(search_stats)
+        # output of a worker is printed in one piece per search
+        print(output, end='')
+    return factories
+
+
+def _fetch_search(link_model, num_pages, known_ids: Optional[Set[int]]) -> Tuple[Optional[ItemFactory], str, Tuple, Dict]:
+    # runs in a worker process, one search at a time
+    output = io.StringIO()
+    with redirect_stdout(output):
+        factory = create_factory(link_model, num_pages, known_ids)
+    # the metrics of this search are added to the ones of the main process
+    search_metrics = metrics.snapshot()
+    metrics.reset()
+    return factory, output.getvalue(), search_metrics, profiler.take_stats()
+
+
+def _init_process(processes: int, record_mode, record_directory, profile_mode) -> None:
+    # every worker process gets its share of the request limits per host
+    host_limiter.share(processes)
+    recorder.configure(record_mode, record_directory)
+    # sampling only covers the main process, workers are profiled with cProfile
+    profiler.configure(None, CPROFILE if profile_mode == CPROFILE else None)
+
+
+def _get_process_executor(processes: int) -> ProcessPoolExecutor:
+    global _process_executor
+    if _process_executor is None:
+        # "spawn" does not copy locks or connections held by threads of this process
+        _process_executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=_init_process,
+                                                initargs=(processes, recorder.mode, recorder.directory,
+                                                          profiler.mode))
+    return _process_executor
@@ -1,20 +1,50 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
 import requests
-from bs4 import BeautifulSoup
-from bs4.element import Tag
 
 from ebayAlert import create_logger
-from ebayAlert.scrapping.scrapeops import header_list, get_random_header
+from ebayAlert.core.configs import configs
+from ebayAlert.core.http import http_client
+from ebayAlert.core.metrics import metrics, FETCH, PARSE
+from ebayAlert.core.price import parse_price
+from ebayAlert.core.ratelimit import HostLimiter
+from ebayAlert.core.replay import recorder
+from ebayAlert.scrapping.parser import HtmlParser, html_parser
+from ebayAlert.scrapping.scrapeops import get_random_header
 
 log = create_logger(__name__)
 
+# shared by all fetching threads, paces the requests per host
+host_limiter = HostLimiter(configs.FETCH_HOST_CONCURRENCY, configs.FETCH_HOST_RATE, configs.FETCH_HOST_BURST)
+
 
-class BaseItem:
-    def __init__(self, contents: Tag):
-        self.contents = contents
+class BaseItem(ABC):
+    """
+    all fields are extracted from the parsed page once (from_node), the page itself is not kept
+    """
+    __slots__ = ("id", "title", "price", "price_cents", "negotiable", "shipping", "location", "link", "description",
+                 "old_price", "pricehint", "pricerange")
+
+    def __init__(self, id: int, title: str, price: str, shipping: str, location: str, link: str,
+                 description: str = "No Description"):
+        self.id = id
+        self.title = title
+        self.price = price
+        self.price_cents, self.negotiable = parse_price(price)
+        self.shipping = shipping
+        self.location = location
+        self.link = link
+        self.description = description
         self.old_price = ""
         self.pricehint = ""
         self.pricerange = ""
 
+    @classmethod
+    @abstractmethod
+    def from_node(cls, node, parser: HtmlParser) -> "BaseItem":
+        pass
+
     @property
     def print_price(self) -> str:
         print_price = self.price
@@ -29,32 +59,53 @@ class BaseItem:
     def __repr__(self):
         return '{}, {}; {}'.format(self.id, self.title, self.price)
 
-    def _find_text_in_class(self, class_name: str):
-        found = self.contents.find(attrs={"class": f"{class_name}"})
+    @staticmethod
+    def _find_text_in_class(node, parser: HtmlParser, class_name: str):
+        found = parser.select_one(node, "." + ".".join(class_name.split()))
         if found:
-            return found.text.strip()
+            return parser.text(found)
 
-    def _find_text_in_child_of_class(self, class_name: str):
-        found = self.contents.find(attrs={"class": f"{class_name}"})
-        if found:
-            found = found.contents[0]
-            if found:
-                return found.text.strip()
+
+class FetchError(Exception):
+    """
+    a page could not be fetched (connection error, error status, not recorded when replaying)
+    """
 
 
 class ItemFactory:
-    @staticmethod
-    def get_webpage(url: str) -> BeautifulSoup:
-        response = requests.get(url, headers=get_random_header(header_list))
+    parser = html_parser
+
+    @classmethod
+    def get_webpage(cls, url: str, scope: Optional[List[str]] = None, revalidate: bool = False):
+        """
+        returns the parsed page, scope: "#id"/".class" of the elements to be parsed at least
+        revalidate: nothing is returned if the page did not change since the last request
+        raises FetchError if the page could not be fetched
+        """
+        if recorder.replaying:
+            page = recorder.load_page(url)
+            if page is None:
+                raise FetchError(f"webpage not recorded: {url}")
+            status_code, text = page
+        else:
+            try:
+                with host_limiter.limit(url), metrics.timer(FETCH):
+                    # a recording always contains the whole page
+                    response = http_client.get(url, headers=get_random_header(),
+                                               revalidate=revalidate and not recorder.recording)
+            except requests.RequestException as e:
+                raise FetchError(f"webpage fetching error for url: {url} ERROR: {e}") from e
+            metrics.count("requests")
+            metrics.count("bytes_downloaded", len(response.content))
+            status_code, text = response.status_code, response.text
+            if recorder.recording:
+                recorder.save_page(url, status_code, text)
         # print(f"<< target url: {url}")
-        if response and response.status_code == 200:
-            cleaned_response = response.text.replace("&#8203", "")
-            soup = BeautifulSoup(cleaned_response, "html.parser")
-            return soup
+        if status_code == 304:
+            log.info(f"not modified: {url}")
+            metrics.count("not_modified")
+        elif status_code == 200:
+            with metrics.timer(PARSE):
+                return cls.parser.parse(text, scope)
         else:
-            print(f"<< webpage fetching error for url: {url} STATUS: {response.status_code} TEXT: {response.text}")
-
-
-
-
-
+            raise FetchError(f"webpage fetching error for url: {url} STATUS: {status_code} TEXT: {text}")
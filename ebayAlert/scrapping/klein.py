@@ -1,72 +1,76 @@
-from typing import Generator
-from bs4 import BeautifulSoup
-from random import randint
-from time import sleep
+from typing import Generator, Optional, Set
 
-from ebayAlert.scrapping.item import BaseItem, ItemFactory
+from ebayAlert.scrapping.item import BaseItem, FetchError, ItemFactory
+from ebayAlert.scrapping.parser import HtmlParser
 from ebayAlert import create_logger
+from ebayAlert.core.configs import configs
+from ebayAlert.core.metrics import metrics, PARSE
 from ebayAlert.core.settings import settings
 
 log = create_logger(__name__)
 
 
 class KleinItem(BaseItem):
-    @property
-    def link(self) -> str:
-        if self.contents.get('data-href'):
-            return settings.KLEIN_URL_BASE + self.contents.get('data-href')
-        else:
-            return "No url found."
+    __slots__ = ()
 
-    @property
-    def shipping(self) -> str:
-        return self._find_text_in_class("aditem-main--middle--price-shipping--shipping") or "No Shipping"
-
-    @property
-    def title(self) -> str:
-        return self._find_text_in_class("ellipsis") or "No Title"
-
-    @property
-    def price(self) -> str:
-        return self._find_text_in_class("aditem-main--middle--price-shipping--price") or "No Price"
-
-    @property
-    def description(self) -> str:
+    @classmethod
+    def from_node(cls, node, parser: HtmlParser) -> "KleinItem":
+        link = parser.attr(node, 'data-href')
         # not in use currently
-        description = self._find_text_in_class("aditem-main--middle--description")
-        if description:
-            return description.replace("\n", " ")
-        else:
-            return "No Description"
-
-    @property
-    def id(self) -> int:
-        return int(self.contents.get('data-adid')) or 0
-
-    @property
-    def location(self):
-        return self._find_text_in_class("aditem-main--top--left") or "No location"
+        description = cls._find_text_in_class(node, parser, "aditem-main--middle--description")
+        return cls(
+            id=int(parser.attr(node, 'data-adid')) or 0,
+            title=cls._find_text_in_class(node, parser, "ellipsis") or "No Title",
+            price=cls._find_text_in_class(node, parser, "aditem-main--middle--price-shipping--price") or "No Price",
+            shipping=cls._find_text_in_class(node, parser, "aditem-main--middle--price-shipping--shipping") or "No Shipping",
+            location=cls._find_text_in_class(node, parser, "aditem-main--top--left") or "No location",
+            link=settings.KLEIN_URL_BASE + link if link else "No url found.",
+            description=description.replace("\n", " ") if description else "No Description"
+        )
 
 
 class KleinItemFactory(ItemFactory):
-    def __init__(self, link_model, npage_max):
+    def __init__(self, link_model, npage_max, known_ids: Optional[Set[int]] = None):
+        """
+        known_ids: post IDs already stored for this search
+        results are sorted newest first, scanning stops at a page that is mostly known (PAGINATION_STOP_RATIO)
+        without known IDs (a new search) all npage_max pages are scanned
+        raises FetchError if the first page could not be fetched, a failed later page ends the scan
+        """
         self.item_list = []
         npage = 1
         while 0 < npage <= npage_max:
-            web_page_soup = self.get_webpage(self.generate_url(link_model, npage))
-            if web_page_soup:
-                articles = self.extract_item_from_page(web_page_soup)
-                for article in articles:
-                    self.item_list.append(KleinItem(article))
-                npage_found = len(web_page_soup.find(attrs={"class": "pagination-pages"}).find_all())
-                if npage < npage_found and npage <= npage_max:
+            try:
+                web_page = self.get_webpage(self.generate_url(link_model, npage), ["#srchrslt-adtable", ".pagination-pages"])
+            except FetchError as e:
+                if npage == 1:
+                    raise
+                # the posts of the pages before are kept
+                print(f"<< {e}")
+                break
+            if web_page:
+                with metrics.timer(PARSE):
+                    page_items = [KleinItem.from_node(article, self.parser) for article in self.extract_item_from_page(web_page)]
+                self.item_list.extend(page_items)
+                pagination = self.parser.select_one(web_page, ".pagination-pages")
+                npage_found = len(self.parser.select(pagination, "*")) if pagination else 0
+                if self.is_page_known(page_items, known_ids):
+                    npage = 0
+                elif npage < npage_found and npage <= npage_max:
+                    # pacing between pages is done by the host limiter in get_webpage
                     npage += 1
-                    sleep(randint(0, 20) / 10)
                 else:
                     npage = 0
             else:
                 npage = 0
 
+    @staticmethod
+    def is_page_known(page_items, known_ids: Optional[Set[int]]) -> bool:
+        if not known_ids or not page_items or configs.PAGINATION_STOP_RATIO <= 0:
+            return False
+        known = sum(1 for item in page_items if item.id in known_ids)
+        return known >= configs.PAGINATION_STOP_RATIO * len(page_items)
+
     @staticmethod
     def generate_url(link_model, npage=1) -> str:
         # generate url from DB using URL placeholders: {NPAGE} {SEARCH_TERM}
@@ -83,12 +87,13 @@ class KleinItemFactory(ItemFactory):
         url = settings.KLEIN_URL_BASE + link_model.url.format(PAGENSEARCH=current_page+search_term)
         return url
 
-    @staticmethod
-    def extract_item_from_page(soup: BeautifulSoup) -> Generator:
-        result = soup.find('ul', id="srchrslt-adtable")
+    @classmethod
+    def extract_item_from_page(cls, web_page) -> Generator:
+        result = cls.parser.select_one(web_page, "ul#srchrslt-adtable")
         if result:
-            articles = result.find_all('li', class_="ad-listitem")
+            articles = cls.parser.select(result, "li.ad-listitem")
             if articles:
                 for item in articles:
-                    if item.article:
-                        yield item.article
+                    article = cls.parser.select_one(item, "article")
+                    if article:
+                        yield article
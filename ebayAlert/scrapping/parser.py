@@ -0,0 +1,134 @@
+import importlib.util
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from ebayAlert import create_logger
+from ebayAlert.core.configs import configs
+
+log = create_logger(__name__)
+
+
+class HtmlParser(ABC):
+    """
+    parser backend used by the item factories, nodes are only accessed through these methods
+    selectors are CSS selectors
+    """
+    name = ""
+
+    @abstractmethod
+    def parse(self, html: str, scope: Optional[List[str]] = None):
+        """
+        scope: "#id" or ".class" of the elements the factory needs, a backend may skip everything else
+        """
+        pass
+
+    @abstractmethod
+    def select(self, node, selector: str) -> List:
+        pass
+
+    @abstractmethod
+    def select_one(self, node, selector: str):
+        pass
+
+    @abstractmethod
+    def text(self, node) -> str:
+        pass
+
+    @abstractmethod
+    def attr(self, node, name: str) -> Optional[str]:
+        pass
+
+
+class SoupParser(HtmlParser):
+    def __init__(self, features: str = "html.parser"):
+        self.name = features
+
+    def parse(self, html: str, scope: Optional[List[str]] = None):
+        parse_only = None
+        if scope:
+            parse_only = SoupStrainer(_scope_matcher(scope))
+        return BeautifulSoup(html, self.name, parse_only=parse_only)
+
+    def select(self, node, selector: str) -> List:
+        return node.select(selector)
+
+    def select_one(self, node, selector: str):
+        return node.select_one(selector)
+
+    def text(self, node) -> str:
+        return node.get_text().replace("\u200b", "").strip()
+
+    def attr(self, node, name: str) -> Optional[str]:
+        return node.get(name)
+
+
+class SelectolaxParser(HtmlParser):
+    name = "selectolax"
+
+    def __init__(self):
+        try:
+            from selectolax.lexbor import LexborHTMLParser as SelectolaxHTMLParser
+        except ImportError:
+            # selectolax < 0.3.13 only has the modest backend
+            from selectolax.parser import HTMLParser as SelectolaxHTMLParser
+        self.html_parser = SelectolaxHTMLParser
+
+    def parse(self, html: str, scope: Optional[List[str]] = None):
+        # parsing the whole page is faster than the scope lookup here
+        return self.html_parser(html)
+
+    def select(self, node, selector: str) -> List:
+        # like BeautifulSoup, only descendants of node are selected: a match of node itself comes first
+        # compared by mem_id, == compares the serialized HTML of the nodes
+        found = node.css(selector)
+        if found and found[0].mem_id == getattr(node, "mem_id", None):
+            del found[0]
+        return found
+
+    def select_one(self, node, selector: str):
+        return node.css_first(selector)
+
+    def text(self, node) -> str:
+        return node.text(deep=True).replace("\u200b", "").strip()
+
+    def attr(self, node, name: str) -> Optional[str]:
+        return node.attributes.get(name)
+
+
+def _scope_matcher(scope: List[str]):
+    ids = {selector[1:] for selector in scope if selector.startswith("#")}
+    classes = {selector[1:] for selector in scope if selector.startswith(".")}
+
+    def in_scope(name, attrs) -> bool:
+        if not isinstance(attrs, dict):
+            return False
+        if attrs.get("id") in ids:
+            return True
+        class_names = attrs.get("class") or []
+        if isinstance(class_names, str):
+            class_names = class_names.split()
+        return not classes.isdisjoint(class_names)
+    return in_scope
+
+
+def get_parser(name: str = "") -> HtmlParser:
+    """
+    name: "selectolax", "lxml", "html.parser" or "" for the fastest one installed
+    """
+    if name in ("", "selectolax"):
+        try:
+            return SelectolaxParser()
+        except ImportError:
+            if name:
+                log.error("selectolax should be installed\npip install selectolax")
+    if name in ("", "lxml"):
+        if importlib.util.find_spec("lxml"):
+            return SoupParser("lxml")
+        if name:
+            log.error("lxml should be installed\npip install lxml")
+    return SoupParser("html.parser")
+
+
+html_parser = get_parser(configs.HTML_PARSER)
@@ -1,18 +1,116 @@
+import json
+import os
+import threading
+from random import choice
+from time import time
+from typing import Dict, List
+
 import requests
 
-from random import randint
+from ebayAlert import create_logger
 from ebayAlert.core.configs import configs
+from ebayAlert.core.http import http_client
+
+log = create_logger(__name__)
+
+# used when there is neither a cache file nor an answer from ScrapeOPS
+FALLBACK_HEADERS = [
+    {
+        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                      "Chrome/118.0.0.0 Safari/537.36",
+        "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+        "accept-language": "de-DE,de;q=0.9,en-US;q=0.8,en;q=0.7",
+        "upgrade-insecure-requests": "1",
+    },
+    {
+        "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+                      "Version/16.6 Safari/605.1.15",
+        "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "accept-language": "de-DE,de;q=0.9",
+        "upgrade-insecure-requests": "1",
+    },
+    {
+        "user-agent": "Mozilla/5.0 (X11; Linux x86_64; rv:118.0) Gecko/20100101 Firefox/118.0",
+        "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+        "accept-language": "de,en-US;q=0.7,en;q=0.3",
+        "upgrade-insecure-requests": "1",
+    },
+]
+
+
+class HeaderPool:
+    """
+    browser headers from ScrapeOPS, fetched on first use (not at import) and cached in a file
+    a stale pool is used while it is refreshed in the background
+    """
+    def __init__(self, cache_file: str, ttl: int):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.headers = None
+        self.loaded = 0
+        self.refreshing = False
+        self.lock = threading.Lock()
+
+    def get_random_header(self) -> Dict[str, str]:
+        with self.lock:
+            if self.headers is None:
+                self.headers, self.loaded = self._load()
+            if time() - self.loaded > self.ttl and not self.refreshing:
+                self.refreshing = True
+                threading.Thread(target=self._refresh, daemon=True).start()
+            headers = self.headers
+        return dict(choice(headers))
+
+    def _load(self):
+        headers, loaded = self._read_cache()
+        if headers:
+            return headers, loaded
+        # no cache file yet
+        headers = self._fetch()
+        if headers:
+            return headers, time()
+        # ScrapeOPS is asked again when the ttl is over
+        return FALLBACK_HEADERS, time()
+
+    def _refresh(self) -> None:
+        headers = self._fetch()
+        with self.lock:
+            if headers:
+                self.headers = headers
+            # on failure the current headers are kept until the ttl is over again
+            self.loaded = time()
+            self.refreshing = False
+
+    def _fetch(self) -> List[Dict[str, str]]:
+        if not configs.SCRAPEOPS_API_KEY:
+            return []
+        try:
+            response = http_client.get('http://headers.scrapeops.io/v1/browser-headers?api_key=' + configs.SCRAPEOPS_API_KEY)
+            headers = response.json().get('result', [])
+        except (requests.RequestException, ValueError) as e:
+            log.error(e)
+            return []
+        if headers:
+            self._write_cache(headers)
+        return headers
 
+    def _read_cache(self):
+        try:
+            with open(self.cache_file, encoding="utf-8") as cache:
+                return json.load(cache), os.path.getmtime(self.cache_file)
+        except (OSError, ValueError):
+            return None, 0
 
-def get_headers_list():
-    response = requests.get('http://headers.scrapeops.io/v1/browser-headers?api_key=' + configs.SCRAPEOPS_API_KEY)
-    json_response = response.json()
-    return json_response.get('result', [])
+    def _write_cache(self, headers: List[Dict[str, str]]) -> None:
+        try:
+            with open(self.cache_file, "w", encoding="utf-8") as cache:
+                json.dump(headers, cache)
+        except OSError as e:
+            log.error(e)
 
 
-def get_random_header(header_list):
-    random_index = randint(0, len(header_list) - 1)
-    return header_list[random_index]
+header_pool = HeaderPool(configs.SCRAPEOPS_CACHE_FILE, configs.SCRAPEOPS_CACHE_TTL)
 
 
-header_list = get_headers_list()
\ No newline at end of file
+def get_random_header() -> Dict[str, str]:
+    return header_pool.get_random_header()
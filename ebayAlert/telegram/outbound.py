@@ -0,0 +1,207 @@
+import threading
+from collections import OrderedDict, deque
+from functools import partial
+from time import monotonic
+from typing import Callable, List, Optional, Tuple
+
+import requests
+from sqlalchemy.orm import Session
+
+from ebayAlert import create_logger
+from ebayAlert.core.configs import configs
+from ebayAlert.core.http import HttpClient
+from ebayAlert.core.metrics import metrics, TELEGRAM
+from ebayAlert.core.ratelimit import TokenBucket
+from ebayAlert.core.settings import settings
+from ebayAlert.crud.outbox import crud_outbox
+
+log = create_logger(__name__)
+
+# Telegram's maximum message length
+MAX_MESSAGE_LENGTH = 4096
+MESSAGE_SEPARATOR = "\n\n--------------------\n\n"
+
+# 429 is answered with "retry_after" in the body and handled by the queue
+telegram_client = HttpClient(configs.HTTP_TIMEOUT, configs.HTTP_RETRIES, configs.HTTP_BACKOFF, configs.HTTP_POOL_SIZE,
+                             retry_statuses=(500, 502, 503, 504))
+
+
+class TelegramQueue:
+    """
+    outbound Telegram messages, sent by a pool of worker threads while scraping and matching go on
+    - a chat is sent to by one worker at a time, at most TELEGRAM_CHAT_RATE messages per second
+    - at most TELEGRAM_GLOBAL_RATE messages per second per bot
+    - on 429 the chat waits "retry_after" seconds and the messages are sent again
+    - several pending messages for one chat are grouped into one message
+    """
+    def __init__(self, workers: int, chat_rate: float, global_rate: float, max_attempts: int):
+        self.workers = max(1, int(workers))
+        self.chat_rate = chat_rate
+        self.global_rate = global_rate
+        self.max_attempts = max_attempts
+        # (bottoken, chat_id) -> deque of (text, attempts, callback)
+        self.pending = OrderedDict()
+        self.busy = set()
+        self.blocked_until = {}
+        self.chat_buckets = {}
+        self.bot_buckets = {}
+        self.unfinished = 0
+        self.sent = 0
+        self.failed = 0
+        self.threads = []
+        self.condition = threading.Condition()
+
+    def put(self, text: str, chat_id, priority: bool, callback: Optional[Callable[[bool], None]] = None) -> None:
+        """
+        callback(success) is called from a worker thread once the message is sent or given up
+        """
+        bottoken = configs.BOTTOKEN_PRIO if priority else configs.BOTTOKEN
+        with self.condition:
+            self.pending.setdefault((bottoken, str(chat_id)), deque()).append((text, 0, callback))
+            self.unfinished += 1
+            if len(self.threads) < self.workers:
+                thread = threading.Thread(target=self._work, daemon=True)
+                self.threads.append(thread)
+                thread.start()
+            self.condition.notify()
+
+    def join(self) -> None:
+        with self.condition:
+            while self.unfinished > 0:
+                self.condition.wait()
+
+    def _work(self) -> None:
+        while True:
+            with self.condition:
+                key, wait = self._next_chat()
+                while key is None:
+                    self.condition.wait(wait)
+                    key, wait = self._next_chat()
+                self.busy.add(key)
+                batch = self._take_batch(key)
+                chat_bucket = self.chat_buckets.setdefault(key, TokenBucket(self.chat_rate))
+                bot_bucket = self.bot_buckets.setdefault(key[0], TokenBucket(self.global_rate, int(self.global_rate)))
+            chat_bucket.acquire()
+            bot_bucket.acquire()
+            with metrics.timer(TELEGRAM):
+                success, retry_after = self._send(key, MESSAGE_SEPARATOR.join(message[0] for message in batch))
+            self._finish(key, batch, success, retry_after)
+
+    def _next_chat(self) -> Tuple[Optional[Tuple[str, str]], Optional[float]]:
+        # first chat with messages that is neither being sent to nor waiting after a 429
+        now = monotonic()
+        wait = None
+        for key, messages in self.pending.items():
+            if not messages or key in self.busy:
+                continue
+            blocked_until = self.blocked_until.get(key, 0)
+            if blocked_until > now:
+                wait = blocked_until - now if wait is None else min(wait, blocked_until - now)
+                continue
+            return key, None
+        return None, wait
+
+    def _take_batch(self, key) -> List:
+        messages = self.pending[key]
+        batch = [messages.popleft()]
+        length = len(batch[0][0])
+        while messages and length + len(MESSAGE_SEPARATOR) + len(messages[0][0]) <= MAX_MESSAGE_LENGTH:
+            length += len(MESSAGE_SEPARATOR) + len(messages[0][0])
+            batch.append(messages.popleft())
+        return batch
+
+    def _send(self, key, text: str) -> Tuple[bool, Optional[float]]:
+        bottoken, chat_id = key
+        try:
+            response = telegram_client.post(settings.TELEGRAM_API_SEND.format(bottoken=bottoken, chat_id=chat_id),
+                                            data={"text": text})
+        except requests.RequestException as e:
+            log.error(e)
+            return False, None
+        if response.status_code == 200:
+            return True, None
+        try:
+            answer = response.json()
+        except ValueError:
+            answer = {}
+        log.error(f"telegram chat {chat_id}: {response.status_code} {answer.get('description', response.text)}")
+        if response.status_code == 429:
+            return False, float(answer.get("parameters", {}).get("retry_after", 1))
+        return False, None
+
+    def _finish(self, key, batch, success: bool, retry_after: Optional[float]) -> None:
+        with self.condition:
+            self.busy.discard(key)
+            metrics.count("telegram_requests")
+            if success:
+                self.sent += len(batch)
+                metrics.count("telegram_sent", len(batch))
+                done = [(callback, True) for _, _, callback in batch]
+            else:
+                attempts = batch[0][1] + 1
+                if retry_after is None:
+                    retry_after = configs.HTTP_BACKOFF * 2 ** attempts
+                self.blocked_until[key] = monotonic() + retry_after
+                retries = [(text, tries + 1, callback) for text, tries, callback in batch if tries + 1 < self.max_attempts]
+                # messages are sent again first, in their order
+                self.pending[key].extendleft(reversed(retries))
+                done = [(callback, False) for text, tries, callback in batch if tries + 1 >= self.max_attempts]
+                self.failed += len(done)
+                metrics.count("telegram_failed", len(done))
+            self.condition.notify_all()
+        for callback, result in done:
+            if callback:
+                callback(result)
+        with self.condition:
+            self.unfinished -= len(done)
+            self.condition.notify_all()
+
+
+class OutboxSender:
+    """
+    drains pending rows of the outbox table into the telegram queue
+    delivery results are collected from the workers and written back by flush()
+    a row is marked sent after delivery only, rows of a crashed run are sent by the next one
+    a row is tried once per run (drain is called after every search), failed rows wait for the next run
+    """
+    def __init__(self, queue: TelegramQueue, max_attempts: int):
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.in_flight = set()
+        self.failed = set()
+        self.results = []
+        self.lock = threading.Lock()
+
+    def drain(self, db: Session) -> None:
+        self.flush(db)
+        for row in crud_outbox.get_pending(db, self.max_attempts):
+            if row.id not in self.in_flight and row.id not in self.failed:
+                self.in_flight.add(row.id)
+                self.queue.put(row.message, row.chat_id, bool(row.priority), callback=partial(self._done, row.id))
+
+    def flush(self, db: Session) -> None:
+        with self.lock:
+            results, self.results = self.results, []
+        if results:
+            crud_outbox.mark_sent([row_id for row_id, success in results if success], db)
+            crud_outbox.add_attempt([row_id for row_id, success in results if not success], db)
+            db.commit()
+            self.in_flight.difference_update(row_id for row_id, _ in results)
+            self.failed.update(row_id for row_id, success in results if not success)
+
+    def new_run(self) -> None:
+        # rows that failed in the last run are tried again
+        self.failed.clear()
+
+    def close(self, db: Session) -> None:
+        self.queue.join()
+        self.flush(db)
+
+    def _done(self, row_id: int, success: bool) -> None:
+        with self.lock:
+            self.results.append((row_id, success))
+
+
+telegram_queue = TelegramQueue(configs.TELEGRAM_WORKERS, configs.TELEGRAM_CHAT_RATE, configs.TELEGRAM_GLOBAL_RATE,
+                               configs.TELEGRAM_MAX_ATTEMPTS)
+outbox_sender = OutboxSender(telegram_queue, configs.OUTBOX_MAX_ATTEMPTS)
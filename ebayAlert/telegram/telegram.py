@@ -1,24 +1,27 @@
-import requests
-
+from ebayAlert import create_logger
 from ebayAlert.core.configs import configs
+from ebayAlert.core.http import http_client
 from ebayAlert.core.settings import settings
+from ebayAlert.telegram.outbound import telegram_queue
 from urllib.parse import urlencode
 
+log = create_logger(__name__)
+
 
 def telegram_api_send(bottoken, chat_id):
     return settings.TELEGRAM_API_SEND.format(bottoken=bottoken, chat_id=chat_id)
 
 
-def send_formatted_message(item, chat_id, priority):
-    message = f"{configs.SOURCE_INDICATOR}{item.title}\n\n{item.print_price}\n\n{item.shipping}\n({item.location})\n\n"
+def format_message(item) -> str:
+    # items without a formatted price show the price as stored
+    message = f"{configs.SOURCE_INDICATOR}{item.title}\n\n{getattr(item, 'print_price', item.price)}\n\n{item.shipping}\n({item.location})\n\n"
     message += f'<a href="{item.link}">{item.link}</a>'
-    message_encoded = urlencode({"text": message})
-    sending_url = ""
-    if priority:
-        sending_url = telegram_api_send(configs.BOTTOKEN_PRIO, chat_id) + message_encoded
-    else:
-        sending_url = telegram_api_send(configs.BOTTOKEN, chat_id) + message_encoded
-    requests.get(sending_url)
+    return message
+
+
+def send_formatted_message(item, chat_id, priority):
+    # sent in the background, telegram_queue.join() waits for all messages
+    telegram_queue.put(format_message(item), chat_id, priority)
 
 
 def send_test_message(chat_id, priority):
@@ -30,4 +33,4 @@ def send_test_message(chat_id, priority):
     else:
         sending_url = telegram_api_send(configs.BOTTOKEN, chat_id) + message_encoded
     print(f"<< telegram url: {sending_url}")
-    requests.get(sending_url)
\ No newline at end of file
+    http_client.get(sending_url)
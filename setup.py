@@ -14,5 +14,8 @@ setup(
         'setuptools>=65.5.1',
         'scrapeops-scrapy>=0.5.2'
     ],
+    extras_require={
+        'fast': ['numpy>=1.21', 'selectolax>=0.3.12', 'lxml>=4.9.2']
+    },
     entry_points={'console_scripts': 'ebayAlert=ebayAlert.main:cli'}
 )
\ No newline at end of file
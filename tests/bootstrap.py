@@ -0,0 +1,34 @@
+"""
+runs ebayAlert with the defaults of configs.default.py (a local configs.py is not read)
+and its database and cache files in a temporary directory, shared by the tests and the benchmarks
+"""
+import atexit
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_default_configs(prefix: str, **overrides) -> str:
+    """
+    has to be called before ebayAlert is imported, returns the temporary directory (removed at exit)
+    overrides: values of configs, e.g. SQLITE_PROFILE="default"
+    """
+    directory = tempfile.mkdtemp(prefix=prefix)
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    spec = importlib.util.spec_from_file_location("ebayAlert.core.configs",
+                                                  os.path.join(ROOT, "ebayAlert", "core", "configs.default.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.configs.FILE_LOCATION = os.path.join(directory, "ebayAlert.db")
+    module.configs.SCRAPEOPS_CACHE_FILE = os.path.join(directory, "headers.json")
+    module.configs.SCRAPEOPS_API_KEY = ""
+    for name, value in overrides.items():
+        setattr(module.configs, name, value)
+    sys.modules["ebayAlert.core.configs"] = module
+    return directory
@@ -0,0 +1,7 @@
+"""
+the tests run with the defaults of configs.default.py (a local configs.py is not read)
+and a database in a temporary directory, set up before ebayAlert is imported
+"""
+from bootstrap import load_default_configs
+
+DIRECTORY = load_default_configs("ebayAlert-test-")
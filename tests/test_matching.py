@@ -0,0 +1,131 @@
+import random
+import re
+from collections import namedtuple
+
+import pytest
+
+from ebayAlert.matching.index import TitleIndex
+from ebayAlert.matching.query import SearchQuery
+
+Item = namedtuple("Item", ["id", "title"])
+
+TITLES = [
+    "iPhone 12 Pro 128GB",
+    "Apple iphone12pro 256gb defekt",
+    "IPHONE 12 mini Hülle",
+    "iPhone 11 Displayschaden",
+    "Fahrrad für Kinder 24 Zoll",
+    "Kinderfahrrad 20zoll",
+    "Größe M Jacke",
+    "Jacke größe L",
+    "Sofa mit Schlaffunktion",
+    "USB-C Kabel 2m",
+    "usb c Ladegerät 65W",
+    "Lego Technic 42100 Liebherr",
+    "lego 42100",
+    "Defektes Netzteil",
+    "",
+]
+
+SEARCH_STRINGS = [
+    "",
+    "iphone",
+    "iphone 12",
+    "iphone 12 -defekt",
+    "iphone -mini -hülle",
+    "12 gb",
+    "128gb",
+    "gb",
+    "fahrrad",
+    "fahrrad zoll",
+    "24",
+    "für",
+    "größe",
+    "Größe",
+    "iPhone",
+    "usb-c",
+    "usb c",
+    "lego 42100 -technic",
+    "-defekt",
+    "jacke -l",
+    "iphone  12",
+]
+
+
+def old_match_title(item_title, search_terms):
+    # match_title of main.py before SearchQuery
+    title_matching = True
+    for term in search_terms:
+        if not term.startswith("-"):
+            if not old_match_title_cases(item_title, term):
+                title_matching = False
+        elif term.startswith("-"):
+            term = term[1:]
+            if old_match_title_cases(item_title, term):
+                title_matching = False
+    return title_matching
+
+
+def old_match_title_cases(item_title, term):
+    if term.isdigit():
+        return item_title.find(term) > -1
+    if re.search(r"\b" + re.escape(term) + r"\b", item_title):
+        return True
+    if re.search(r"\d" + re.escape(term) + r"\b", item_title):
+        return True
+    return False
+
+
+def old_excludes(item_title, search_string):
+    # exclusion check of filter_message_items before SearchQuery
+    if search_string == "":
+        return False
+    search_term_parts = [x[1:] for x in search_string.split(" ") if x.startswith("-")]
+    search_term_parts.append("defekt")
+    return any(item_title.lower().find(x) > -1 for x in search_term_parts)
+
+
+def random_cases(count: int):
+    rand = random.Random(0)
+    words = ["iphone", "12", "128gb", "gb", "pro", "für", "größe", "hülle", "defekt", "usb", "c", "2", "Zoll", "Ä"]
+    for _ in range(count):
+        title = " ".join(rand.choice(words + ["".join(rand.sample(words, 2))]) for _ in range(rand.randint(0, 5)))
+        search_string = " ".join(("-" if rand.random() < 0.3 else "") + rand.choice(words)
+                                 for _ in range(rand.randint(1, 3)))
+        yield title, search_string
+
+
+@pytest.mark.parametrize("search_string", SEARCH_STRINGS)
+def test_query_matches_like_match_title(search_string):
+    query = SearchQuery(search_string)
+    for title in TITLES:
+        assert query.matches(title.lower()) == old_match_title(title.lower(), search_string.split(" ")), title
+        assert query.excludes(title.lower()) == old_excludes(title, search_string), title
+
+
+@pytest.mark.parametrize("search_string", SEARCH_STRINGS)
+def test_index_matches_like_match_title(search_string):
+    items = [Item(n, title) for n, title in enumerate(TITLES)]
+    index = TitleIndex(items)
+    expected = [item for item in items if old_match_title(item.title.lower(), search_string.split(" "))]
+    assert index.match(SearchQuery(search_string)) == expected
+
+
+def test_random_titles_and_searches():
+    cases = list(random_cases(500))
+    items = [Item(n, title) for n, (title, _) in enumerate(cases)]
+    index = TitleIndex(items)
+    for title, search_string in cases[:200]:
+        query = SearchQuery(search_string)
+        assert query.matches(title.lower()) == old_match_title(title.lower(), search_string.split(" "))
+        assert query.excludes(title.lower()) == old_excludes(title, search_string)
+        expected = [item for item in items if old_match_title(item.title.lower(), search_string.split(" "))]
+        assert index.match(query) == expected, search_string
+
+
+def test_index_without_removed_items():
+    items = [Item(n, title) for n, title in enumerate(TITLES)]
+    index = TitleIndex(items)
+    index.remove(items[0])
+    assert items[0] not in index.match(SearchQuery("iphone 12"))
+    assert items[2] in index.match(SearchQuery("iphone 12"))
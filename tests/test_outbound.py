@@ -0,0 +1,126 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from ebayAlert.core.settings import settings
+from ebayAlert.db.db import Session_klein
+from ebayAlert.models.sqlmodel import Outbox
+from ebayAlert.telegram.outbound import OutboxSender, TelegramQueue, MESSAGE_SEPARATOR
+
+# chat id -> answers of the stub, "ok" once they are used up
+ANSWERS = {
+    # the first message is answered with 429, the chat has to wait and send again
+    "1": [(429, {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                 "parameters": {"retry_after": 1}})],
+    "2": [],
+}
+ALWAYS_429 = "3"
+RETRY_AFTER = 0.2
+ALWAYS_400 = "4"
+
+
+class StubTelegram(ThreadingHTTPServer):
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.answers = {chat_id: list(answers) for chat_id, answers in ANSWERS.items()}
+        # (chat id, text, status, time)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def sent_to(self, chat_id):
+        return [request for request in self.requests if request[0] == chat_id]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        chat_id = parse_qs(urlsplit(self.path).query)["chat_id"][0]
+        text = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())["text"][0]
+        with self.server.lock:
+            if chat_id == ALWAYS_429:
+                status, answer = 429, {"ok": False, "parameters": {"retry_after": RETRY_AFTER}}
+            elif chat_id == ALWAYS_400:
+                status, answer = 400, {"ok": False, "description": "Bad Request: chat not found"}
+            elif self.server.answers[chat_id]:
+                status, answer = self.server.answers[chat_id].pop(0)
+            else:
+                status, answer = 200, {"ok": True}
+            self.server.requests.append((chat_id, text, status, monotonic()))
+        body = json.dumps(answer).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = StubTelegram()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(settings, "TELEGRAM_API_SEND",
+                        f"http://127.0.0.1:{server.server_port}/bot{{bottoken}}/sendMessage?chat_id={{chat_id}}")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_retry_after_batching_and_give_up(stub):
+    queue = TelegramQueue(workers=2, chat_rate=100, global_rate=100, max_attempts=3)
+    results = []
+    start = monotonic()
+    for chat_id, text in (("1", "a1"), ("1", "a2"), ("1", "a3"), ("2", "b1"), (ALWAYS_429, "c1")):
+        queue.put(text, chat_id, False, callback=lambda success, text=text: results.append((text, success)))
+    queue.join()
+
+    # the chat waits retry_after after the 429, then all its pending messages go out in one request
+    first, second = stub.sent_to("1")
+    assert first[2] == 429
+    assert second[2] == 200
+    assert second[1] == MESSAGE_SEPARATOR.join(["a1", "a2", "a3"])
+    assert second[3] - first[3] >= 0.9
+    # other chats are not held up by the 429 of chat 1
+    (other,) = stub.sent_to("2")
+    assert other[1] == "b1"
+    assert other[3] - start < 0.9
+    # given up after max_attempts
+    assert [request[2] for request in stub.sent_to(ALWAYS_429)] == [429, 429, 429]
+
+    assert queue.sent == 4
+    assert queue.failed == 1
+    assert sorted(results) == [("a1", True), ("a2", True), ("a3", True), ("b1", True), ("c1", False)]
+
+
+def test_outbox_row_is_tried_once_per_run(stub):
+    db = Session_klein()
+    db.query(Outbox).delete()
+    db.add_all([Outbox(dedup_key="sent", chat_id="2", priority=0, message="b1"),
+                Outbox(dedup_key="failing", chat_id=ALWAYS_400, priority=0, message="d1")])
+    db.commit()
+    sender = OutboxSender(TelegramQueue(workers=2, chat_rate=100, global_rate=100, max_attempts=1), max_attempts=2)
+
+    # drain is called after every search of a run
+    for _ in range(3):
+        sender.drain(db)
+        sender.queue.join()
+    sender.flush(db)
+    assert len(stub.sent_to(ALWAYS_400)) == 1
+    assert len(stub.sent_to("2")) == 1
+    assert db.query(Outbox).filter_by(dedup_key="failing").one().attempts == 1
+
+    # the next run tries it again, then it is given up
+    for _ in range(2):
+        sender.new_run()
+        sender.drain(db)
+        sender.close(db)
+    assert len(stub.sent_to(ALWAYS_400)) == 2
+    assert db.query(Outbox).filter_by(dedup_key="failing").one().attempts == 2
+    assert db.query(Outbox).filter_by(dedup_key="sent").one().sent is not None
+    db.close()
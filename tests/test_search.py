@@ -0,0 +1,44 @@
+import pytest
+
+from ebayAlert.crud.search import crud_search
+from ebayAlert.db.db import Session_klein
+from ebayAlert.models.sqlmodel import Search, SearchType
+
+
+@pytest.fixture
+def db():
+    session = Session_klein()
+    session.query(Search).delete()
+    session.query(SearchType).delete()
+    session.add_all([
+        SearchType(search_type="KLEIN_TEST", search_url="/s-first/{PAGENSEARCH}k0"),
+        # duplicated search type, the first one is used
+        SearchType(search_type="KLEIN_TEST", search_url="/s-second/{PAGENSEARCH}k0"),
+        SearchType(search_type="EBAY_TEST", search_url="/b/test/0"),
+        Search(id=1, status=1, search_type="KLEIN_TEST", search_string="active"),
+        Search(id=2, status=2, search_type="KLEIN_TEST", search_string="silent"),
+        Search(id=3, status=0, search_type="KLEIN_TEST", search_string="disabled"),
+        Search(id=4, status=None, search_type="KLEIN_TEST", search_string="no status"),
+        Search(id=5, status=1, search_type="EBAY_TEST", search_string=""),
+        Search(id=6, status=2, search_type="EBAY_TEST", search_string=""),
+        Search(id=7, status=None, search_type="EBAY_TEST", search_string=""),
+    ])
+    session.commit()
+    yield session
+    session.query(Search).delete()
+    session.query(SearchType).delete()
+    session.commit()
+    session.close()
+
+
+def test_plan_has_every_active_search_once(db):
+    plan = crud_search.get_plan(db)
+    assert sorted(link_model.id for link_model in plan) == [1, 2, 4, 5]
+    assert {link_model.url for link_model in plan if link_model.search_type == "KLEIN_TEST"} == {"/s-first/{PAGENSEARCH}k0"}
+    # EBAY searches come first
+    assert plan[0].id == 5
+
+
+def test_plan_of_one_search(db):
+    assert [link_model.id for link_model in crud_search.get_plan(db, 4)] == [4]
+    assert crud_search.get_plan(db, 3) == ()
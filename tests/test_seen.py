@@ -0,0 +1,92 @@
+import pytest
+
+from ebayAlert.crud.seen import SeenSet
+from ebayAlert.db.db import Session_klein
+from ebayAlert.models.sqlmodel import KleinPost
+
+PRICE = (1000, False)
+NEW_PRICE = (900, True)
+
+
+@pytest.fixture
+def db():
+    session = Session_klein()
+    session.query(KleinPost).delete()
+    session.add_all([
+        KleinPost(post_id=1, price="10 €", price_cents=1000, negotiable=False, link_id=1),
+        KleinPost(post_id=2, price="20 €", price_cents=2000, negotiable=False, link_id=1),
+        # not linked to a search yet, has to be updated when found again
+        KleinPost(post_id=3, price="30 €", price_cents=3000, negotiable=False, link_id=None),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def loaded(db, memory_budget=2 ** 20) -> SeenSet:
+    seen = SeenSet(memory_budget)
+    seen.load(db)
+    return seen
+
+
+def test_stored_posts_are_seen_with_their_price(db):
+    seen = loaded(db)
+    assert seen.contains(1, PRICE)
+    assert seen.contains(2, (2000, False))
+    assert not seen.contains(1, NEW_PRICE)
+    assert not seen.contains(1, (1000, True))
+    assert not seen.contains(3, (3000, False))
+    assert not seen.contains(4, PRICE)
+
+
+def test_additions_are_seen_after_commit_only(db):
+    seen = loaded(db)
+    seen.add(4, PRICE)
+    assert not seen.contains(4, PRICE)
+    seen.commit()
+    assert seen.contains(4, PRICE)
+
+
+def test_rolled_back_additions_are_looked_up_again(db):
+    seen = loaded(db)
+    seen.add(4, PRICE)
+    seen.rollback()
+    seen.commit()
+    assert not seen.contains(4, PRICE)
+
+
+def test_price_change_and_revert(db):
+    seen = loaded(db)
+    # price drops: the old price is not seen anymore, a revert has to be noticed
+    seen.add(1, NEW_PRICE, PRICE)
+    seen.commit()
+    assert seen.contains(1, NEW_PRICE)
+    assert not seen.contains(1, PRICE)
+    # back to the stored price
+    seen.add(1, PRICE, NEW_PRICE)
+    seen.commit()
+    assert seen.contains(1, PRICE)
+    assert not seen.contains(1, NEW_PRICE)
+
+
+def test_rolled_back_price_change_keeps_the_old_price(db):
+    seen = loaded(db)
+    seen.add(1, NEW_PRICE, PRICE)
+    seen.rollback()
+    assert seen.contains(1, PRICE)
+    assert not seen.contains(1, NEW_PRICE)
+
+
+def test_disabled_over_memory_budget(db):
+    seen = loaded(db, memory_budget=8)
+    assert not seen.enabled
+    assert not seen.contains(1, PRICE)
+    seen.add(4, PRICE)
+    seen.commit()
+    assert not seen.contains(4, PRICE)
+
+
+def test_disabled_without_budget(db):
+    seen = loaded(db, memory_budget=0)
+    assert not seen.enabled
+    assert not seen.contains(1, PRICE)